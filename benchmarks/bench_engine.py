@@ -0,0 +1,97 @@
+""" Benchmark the list-of-lists TicTacToe engine against BitboardTicTacToe.
+
+Run from the repository root:
+    python -m benchmarks.bench_engine
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so imports work when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from game.logic import TicTacToe
+from game.bitboard import BitboardTicTacToe
+import argparse
+import random
+import timeit
+
+ENGINES = {'list': TicTacToe, 'bitboard': BitboardTicTacToe}
+
+
+def random_positions(engine, n_positions, seed):
+    """ Build n mid-game positions by playing random moves. """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < n_positions:
+        game = engine()
+        for _ in range(rng.randint(0, 6)):
+            moves = game.get_legal_moves()
+            if game.game_over or not moves:
+                break
+            game.make_move(*rng.choice(moves))
+        positions.append(game)
+    return positions
+
+
+def play_random_games(engine, n_games, seed):
+    """ Play n full random games, the workload of training and simulation. """
+    rng = random.Random(seed)
+    game = engine()
+    for _ in range(n_games):
+        while not game.game_over:
+            game.make_move(*rng.choice(game.get_legal_moves()))
+            game.get_board_state()
+        game.reset()
+
+
+def bench(engine, n_positions, n_games, repeat, seed):
+    """ Return the best time in seconds for each workload. """
+    positions = random_positions(engine, n_positions, seed)
+
+    def check_winner():
+        for game in positions:
+            game.check_winner(1)
+            game.check_winner(2)
+
+    def legal_moves():
+        for game in positions:
+            game.get_legal_moves()
+
+    def board_full():
+        for game in positions:
+            game.is_board_full()
+
+    def board_state():
+        for game in positions:
+            game.get_board_state()
+
+    def state_code():
+        for game in positions:
+            game.state_code
+
+    workloads = {
+        'check_winner': check_winner,
+        'get_legal_moves': legal_moves,
+        'is_board_full': board_full,
+        'get_board_state': board_state,
+        'state_code': state_code,
+        'random_games': lambda: play_random_games(engine, n_games, seed),
+    }
+    return {name: min(timeit.repeat(fn, number=1, repeat=repeat)) for name, fn in workloads.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark TicTacToe engines')
+    parser.add_argument('--positions', type=int, default=20_000, help='Number of positions per micro benchmark')
+    parser.add_argument('--games', type=int, default=5_000, help='Number of random games to play')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repeats, the best time is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = {name: bench(engine, args.positions, args.games, args.repeat, args.seed) for name, engine in ENGINES.items()}
+
+    print(f"{'workload':<18}{'list (ms)':>12}{'bitboard (ms)':>16}{'speedup':>10}")
+    for workload in results['list']:
+        base = results['list'][workload]
+        fast = results['bitboard'][workload]
+        print(f"{workload:<18}{base * 1000:>12.2f}{fast * 1000:>16.2f}{base / fast:>9.1f}x")
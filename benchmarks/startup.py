@@ -0,0 +1,74 @@
+""" Startup time of the command line entry points, each run in a fresh interpreter.
+
+Every case is timed over several runs, the median is reported together with
+the heavy optional modules the process imported. Plots use the non-interactive
+Agg backend so runs that plot do not wait for a window.
+
+Run from the repository root, --root points at another checkout to compare:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --root ../baseline-checkout --repeat 10
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so imports work when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import os
+import statistics
+import subprocess
+import time
+
+HEAVY_MODULES = ('matplotlib', 'pandas', 'tqdm', 'pygame')
+
+# Name and arguments of every case, the script path is relative to the repository root
+CASES = [
+    ('main.py --help', ['main.py', '--help']),
+    ('main.py --load', ['main.py', '--load', 'models/model.ttm']),
+    ('main.py --load --headless', ['main.py', '--load', 'models/model.ttm', '--headless']),
+    ('gui/gui.py --help', ['gui/gui.py', '--help']),
+]
+
+# Runs a script like `python script args` would and prints the heavy modules it imported on exit
+RUNNER = """
+import atexit, runpy, sys
+sys.argv = sys.argv[1:]
+sys.path.insert(0, __import__('os').path.dirname(sys.argv[0]))
+atexit.register(lambda: print('modules:' + ','.join(m for m in {heavy!r} if m in sys.modules), file=sys.stderr))
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def time_case(root, args, repeat):
+    """ Median wall time in ms and the heavy modules imported, None if the case fails """
+    env = dict(os.environ, MPLBACKEND='Agg', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    command = [sys.executable, '-c', RUNNER.format(heavy=HEAVY_MODULES)] + args
+
+    times = []
+    modules = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None
+        modules = result.stderr.strip().splitlines()[-1].removeprefix('modules:')
+
+    return statistics.median(times), modules
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Startup time of main.py and gui/gui.py')
+    parser.add_argument('--root', type=str, default=str(Path(__file__).parent.parent),
+                        help='Repository checkout to run the entry points from.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case, the median is reported.')
+    args = parser.parse_args()
+
+    print(f"{'case':28s} {'median ms':>10s}  heavy modules imported")
+    for name, case_args in CASES:
+        result = time_case(args.root, case_args, args.repeat)
+        if result is None:
+            print(f"{name:28s} {'failed':>10s}")
+        else:
+            print(f"{name:28s} {result[0]:10.0f}  {result[1] or '-'}")
@@ -0,0 +1,238 @@
+""" Reproducible benchmarks for the engine, search, training, simulation and model loading.
+
+Run from the repository root:
+    python -m benchmarks.suite run --output bench.json
+    python -m benchmarks.suite compare baseline.json bench.json --threshold 0.10
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so imports work when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from contextlib import redirect_stderr
+from game.logic import TicTacToe
+from game.simulator import GameSimulator
+from game.symbol import Symbol
+from players.minimax_player import MinimaxPlayer
+from players.model_file import MODEL_EXTENSION, ModelFile
+from players.perfect_strategy_player import PerfectStrategyPlayer
+from players.qlearn_player import QLearnPlayer
+from players.random_player import RandomPlayer
+from trainers.qlearn import QLearnTrainer
+from benchmarks.bench_engine import random_positions
+import argparse
+import io
+import json
+import pickle
+import platform
+import random
+import tempfile
+import time
+import numpy as np
+
+SEED = 1234
+
+
+def _seed(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def _best_of(fn, repeat):
+    """ Fastest of repeat runs in seconds """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _metric(value, unit, higher_is_better):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def bench_engine(repeat, scale):
+    """ Calls per second of the TicTacToe hot methods on fixed random positions """
+    positions = random_positions(TicTacToe, 2_000 * scale, SEED)
+    moves = [game.get_legal_moves() for game in positions]
+    results = {}
+
+    def check_winner():
+        for game in positions:
+            game.check_winner(1)
+
+    def legal_moves():
+        for game in positions:
+            game.get_legal_moves()
+
+    def make_move():
+        # Play and undo one move per position so every run sees the same boards
+        for game, legal in zip(positions, moves):
+            if legal and not game.game_over:
+                game.make_move(*legal[0])
+                game.pop()
+
+    for name, fn in (('check_winner', check_winner), ('get_legal_moves', legal_moves), ('make_move', make_move)):
+        results[f'engine.{name}'] = _metric(len(positions) / _best_of(fn, repeat), 'calls/s', True)
+    return results
+
+
+def bench_minimax(repeat, scale):
+    """ MinimaxPlayer.get_move from the empty board, with a new and with a filled cache """
+    counter = MinimaxPlayer(Symbol.X)
+    counter.get_move(TicTacToe())
+    nodes = counter.nodes_explored
+
+    def cold():
+        MinimaxPlayer(Symbol.X).get_move(TicTacToe())
+
+    warm_player = MinimaxPlayer(Symbol.X)
+    warm_player.get_move(TicTacToe())
+
+    def warm():
+        for _ in range(100):
+            warm_player.get_move(TicTacToe())
+
+    return {
+        'minimax.cold_empty_board': _metric(_best_of(cold, repeat), 's', False),
+        'minimax.warm_empty_board': _metric(_best_of(warm, repeat) / 100, 's', False),
+        'minimax.nodes_empty_board': _metric(nodes, 'nodes', False),
+    }
+
+
+def bench_training(repeat, scale):
+    """ QLearnTrainer.train games per second against RandomPlayer and PerfectStrategyPlayer """
+    n_games = 2_000 * scale
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for opponent in (RandomPlayer(Symbol.O), PerfectStrategyPlayer(Symbol.O)):
+            def train():
+                _seed()
+                agent = QLearnPlayer(Symbol.X)
+                # Keep the progress bar out of the benchmark output
+                with redirect_stderr(io.StringIO()):
+                    QLearnTrainer().train(agent, opponent, n_games, str(Path(tmp) / 'model'))
+
+            results[f'train.vs_{type(opponent).__name__}'] = _metric(n_games / _best_of(train, repeat), 'games/s', True)
+    return results
+
+
+def bench_simulation(repeat, scale):
+    """ GameSimulator.simulate games per second, trained agent against RandomPlayer """
+    n_games = 2_000 * scale
+    agent = QLearnPlayer(Symbol.X, epsilon=0)
+    agent.load('models/model.pkl')
+
+    def simulate():
+        _seed()
+        GameSimulator(agent, RandomPlayer(Symbol.O), n_games, Symbol.X).simulate()
+
+    # Same games played 1024 at a time through Player.get_moves, with the memory mapped model
+    batched_agent = QLearnPlayer(Symbol.X, epsilon=0, backend='mmap')
+    batched_agent.load('models/model' + MODEL_EXTENSION)
+
+    def simulate_batched():
+        _seed()
+        GameSimulator(batched_agent, RandomPlayer(Symbol.O), n_games, Symbol.X).simulate(n_boards=1024)
+
+    return {
+        'simulate.qlearn_vs_random': _metric(n_games / _best_of(simulate, repeat), 'games/s', True),
+        'simulate.qlearn_vs_random_batched': _metric(n_games / _best_of(simulate_batched, repeat), 'games/s', True),
+    }
+
+
+def bench_model_load(repeat, scale):
+    """ Time to load every pickle and model file in models/ """
+    results = {}
+    for path in sorted(Path('models').glob('*.pkl')):
+        def load():
+            with open(path, 'rb') as f:
+                pickle.load(f)
+
+        results[f'load.{path.name}'] = _metric(_best_of(load, repeat), 's', False)
+
+    for path in sorted(Path('models').glob('*' + MODEL_EXTENSION)):
+        def open_model():
+            ModelFile(str(path))
+
+        results[f'load.{path.name}'] = _metric(_best_of(open_model, repeat), 's', False)
+    return results
+
+
+WORKLOADS = {
+    'engine': bench_engine,
+    'minimax': bench_minimax,
+    'training': bench_training,
+    'simulation': bench_simulation,
+    'load': bench_model_load,
+}
+
+
+def run(workloads, repeat, scale):
+    results = {}
+    for name in workloads:
+        print(f"Running {name}...", file=sys.stderr)
+        results.update(WORKLOADS[name](repeat, scale))
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': SEED,
+        'repeat': repeat,
+        'scale': scale,
+        'metrics': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """ Print the change of every metric, returns the names of regressed metrics """
+    regressions = []
+    print(f"{'metric':<40}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, metric in current['metrics'].items():
+        if name not in baseline['metrics']:
+            print(f"{name:<40}{'-':>14}{metric['value']:>14.4g}{'new':>10}")
+            continue
+
+        old = baseline['metrics'][name]['value']
+        new = metric['value']
+        # Positive change means better, whichever direction the metric goes
+        change = (new - old) / old if metric['higher_is_better'] else (old - new) / old
+        flag = '  REGRESSION' if change < -threshold else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<40}{old:>14.4g}{new:>14.4g}{change * 100:>9.1f}%{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tic Tac Toe benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and save the results as JSON')
+    run_parser.add_argument('--output', type=str, default='bench.json')
+    run_parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS))
+    run_parser.add_argument('--repeat', type=int, default=3, help='Runs per workload, the best is kept')
+    run_parser.add_argument('--scale', type=int, default=1, help='Multiplier for the workload sizes')
+
+    compare_parser = commands.add_parser('compare', help='Compare results against a stored baseline')
+    compare_parser.add_argument('baseline', type=str)
+    compare_parser.add_argument('current', type=str)
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown before flagging, 0.10 = 10%%')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run(args.workloads, args.repeat, args.scale)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {args.output}")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,169 @@
+from typing import List, Optional, Tuple
+from game.logic import LINES
+from game.encoding import POWERS
+
+# Bit index of a cell is row * 3 + col
+FULL_MASK = 0b111111111
+
+# The 8 winning lines as bitmasks (3 rows, 3 columns, 2 diagonals)
+LINE_MASKS: Tuple[int, ...] = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+# Number of set bits of every mask, precomputed once
+_POPCOUNT: Tuple[int, ...] = tuple(bin(mask).count('1') for mask in range(FULL_MASK + 1))
+
+# Legal moves for every possible occupied mask, precomputed once
+_LEGAL_MOVES: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple((i // 3, i % 3) for i in range(9) if not occupied >> i & 1)
+    for occupied in range(FULL_MASK + 1)
+)
+
+# Same as cell indices
+_LEGAL_CELLS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(i for i in range(9) if not occupied >> i & 1)
+    for occupied in range(FULL_MASK + 1)
+)
+
+# Does a player mask contain a complete line, precomputed once
+_IS_WIN: Tuple[bool, ...] = tuple(
+    any(mask & line == line for line in LINE_MASKS)
+    for mask in range(FULL_MASK + 1)
+)
+
+
+class BitboardTicTacToe:
+    """Tic Tac Toe game logic backed by one 9-bit mask per player.
+
+    Drop-in replacement for game.logic.TicTacToe. `board` is a read-only
+    snapshot, write moves through make_move or push and pop. Only the classic
+    3x3 board is supported.
+    """
+
+    rows = 3
+    cols = 3
+    win_length = 3
+
+    def __init__(self) -> None:
+        self._masks: List[int] = [0, 0, 0]  # Index 0 unused, 1 and 2 are the players
+        self._cells: List[int] = [0] * 9
+        self._move_stack: List[int] = []
+        self._state_code: int = 0
+        self.current_player: int = 1
+        self.game_over: bool = False
+        self.winner: Optional[int] = None
+
+    @property
+    def board(self) -> List[List[int]]:
+        """Board as a list of lists, same layout as TicTacToe.board"""
+        cells = self._cells
+        return [cells[0:3], cells[3:6], cells[6:9]]
+
+    def make_move(self, row: int, col: int) -> bool:
+        """Make a move on the board. Returns True if successful, False otherwise."""
+        if not self.is_valid_move(row, col):
+            return False
+
+        self.push((row, col))
+        return True
+
+    def push(self, move: Tuple[int, int]) -> None:
+        """Play a legal move without validation. Can be undone with pop()."""
+        index = move[0] * 3 + move[1]
+        player = self.current_player
+        self._masks[player] |= 1 << index
+        self._cells[index] = player
+        self._move_stack.append(index)
+        self._state_code += player * POWERS[index]
+
+        # Check for winner
+        if _IS_WIN[self._masks[player]]:
+            self.game_over = True
+            self.winner = player
+        elif self._masks[1] | self._masks[2] == FULL_MASK:
+            self.game_over = True
+            self.winner = 0  # Draw
+        else:
+            self.current_player = 3 - player  # Switch players
+
+    def pop(self) -> Tuple[int, int]:
+        """Undo the last move and return it"""
+        index = self._move_stack.pop()
+        player = self._cells[index]
+        self._masks[player] &= ~(1 << index)
+        self._cells[index] = 0
+        self._state_code -= player * POWERS[index]
+
+        # A move can only be made in an unfinished game, with the mover to play
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        return index // 3, index % 3
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        """Check if a move is valid"""
+        if self.game_over:
+            return False
+        if row < 0 or row >= 3 or col < 0 or col >= 3: # Check if move is inside the board.
+            return False
+
+        return not (self._masks[1] | self._masks[2]) >> (row * 3 + col) & 1 # Check if position is empty
+
+    def get_legal_moves(self) -> List[Tuple[int, int]]:
+        """Return list of all legal moves as (row, col) tuples"""
+        return list(_LEGAL_MOVES[self._masks[1] | self._masks[2]])
+
+    def get_legal_cells(self) -> List[int]:
+        """Return all legal moves as cell indices (row * 3 + col)"""
+        return list(_LEGAL_CELLS[self._masks[1] | self._masks[2]])
+
+    def is_board_full(self) -> bool:
+        """Check if the board is completely filled"""
+        return self._masks[1] | self._masks[2] == FULL_MASK
+
+    def check_winner(self, player: int) -> bool:
+        """Check if the specified player has won"""
+        return _IS_WIN[self._masks[player]]
+
+    def line_counts(self, player: int) -> List[int]:
+        """Number of cells the player holds on every winning line, in TicTacToe.lines order"""
+        mask = self._masks[player]
+        return [_POPCOUNT[mask & line] for line in LINE_MASKS]
+
+    def get_move_history(self) -> List[Tuple[int, int]]:
+        """Moves played so far, oldest first"""
+        return [(index // 3, index % 3) for index in self._move_stack]
+
+    @property
+    def lines(self) -> List[List[Tuple[int, int]]]:
+        """All winning lines as lists of (row, col) cells, in line_counts() order"""
+        return LINES
+
+    def get_board_state(self) -> Tuple[int, ...]:
+        """Return board state"""
+        return tuple(self._cells)
+
+    @property
+    def state_code(self) -> int:
+        """Base-3 code of the board, same as TicTacToe.state_code"""
+        return self._state_code
+
+    def reset(self) -> None:
+        """Reset the game to initial state"""
+        self._masks = [0, 0, 0]
+        self._cells = [0] * 9
+        self._move_stack = []
+        self._state_code = 0
+        self.current_player = 1
+        self.game_over = False
+        self.winner = None
+
+    def __str__(self) -> str:
+        """String representation of the board for debugging"""
+        symbols = {0: '.', 1: 'O', 2: 'X'}
+        lines = []
+        for row in self.board:
+            lines.append(' '.join(symbols[cell] for cell in row))
+        return '\n'.join(lines)
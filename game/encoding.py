@@ -0,0 +1,36 @@
+from functools import lru_cache
+from operator import mul
+from typing import Tuple, Union
+
+# Base-3 encoding of a board: cell i contributes state[i] * 3**i
+N_CELLS = 9
+POWERS: Tuple[int, ...] = tuple(3 ** i for i in range(N_CELLS))
+N_CODES = 3 ** N_CELLS
+
+# A board as a state tuple or as its code, functions taking a State accept both
+State = Union[Tuple[int, ...], int]
+
+
+def encode_state(state: Tuple[int, ...]) -> int:
+    """Encode a board state tuple as an integer in [0, 3**9)"""
+    return sum(map(mul, state, POWERS))
+
+
+def decode_state(code: int) -> Tuple[int, ...]:
+    """Decode an integer back into a board state tuple"""
+    cells = []
+    for _ in range(N_CELLS):
+        code, cell = divmod(code, 3)
+        cells.append(cell)
+    return tuple(cells)
+
+
+def as_code(state: State) -> int:
+    """Code of a board given either as a state tuple or already as a code"""
+    return encode_state(state) if isinstance(state, tuple) else int(state)
+
+
+@lru_cache(maxsize=None)
+def cell_powers(n_cells: int) -> Tuple[int, ...]:
+    """Weight of every cell in the code of a board with n_cells cells, 3**i for cell i"""
+    return tuple(3 ** i for i in range(n_cells))
@@ -0,0 +1,163 @@
+from typing import Dict, List, Optional, TextIO
+import time
+
+# Latency histogram buckets: bucket b counts calls that took [2**(b-1), 2**b) nanoseconds
+N_BUCKETS = 48
+
+# Loops that report their games through next_game() time one in this many games by default
+SAMPLE_EVERY = 16
+
+
+class MethodStats:
+    """ Call count, total time and a log2 latency histogram for one method. """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.buckets: List[int] = [0] * N_BUCKETS
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record(self, elapsed_ns: int) -> None:
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.buckets[min(elapsed_ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def merge(self, other: 'MethodStats') -> None:
+        """ Add the calls recorded by another MethodStats, e.g. from a worker process. """
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+    def percentile(self, p: float) -> int:
+        """ Upper bound in nanoseconds of the bucket holding the p-th percentile call. """
+        target = self.count * p / 100
+        seen = 0
+        for bucket, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return 2 ** bucket
+        return 0
+
+    @property
+    def cache_hit_rate(self) -> Optional[float]:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.count,
+            'total_s': self.total_ns / 1e9,
+            'mean_us': self.total_ns / self.count / 1e3 if self.count else 0.0,
+            'p50_us': self.percentile(50) / 1e3,
+            'p99_us': self.percentile(99) / 1e3,
+            'cache_hit_rate': self.cache_hit_rate,
+        }
+
+
+class Instrumentation:
+    """ Opt-in timing of get_move, make_move and learn calls.
+
+    attach() replaces the methods on the given instances (not their classes) with
+    timing wrappers, detach() restores them. Only the wrapped objects pay for it,
+    a wrapped call costs two perf_counter_ns calls and a few additions, which is
+    a lot next to a Q-table lookup. Loops that call next_game() before every game
+    (GameSimulator, QLearnTrainer) therefore only time one in sample_every games
+    and take the wrappers off for the others, so instrumentation can stay on
+    during training. Without next_game() every call is timed.
+    """
+
+    # sample_every: int - Time one in this many of the games reported through next_game()
+    def __init__(self, sample_every: int = SAMPLE_EVERY) -> None:
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        self.sample_every = sample_every
+        self.stats: Dict[str, MethodStats] = {}
+        self.games = 0          # Games reported through next_game()
+        self.sampled_games = 0  # Of those, the ones that were timed
+        self._wrapped: List[tuple] = []
+        self._timing = False    # Whether the wrappers are in place
+
+    def _wrap(self, obj, method_name: str, label: str) -> None:
+        original = getattr(obj, method_name)
+        # Set when the instance already overrides the method. Told apart from the bound class method
+        # without reading obj.__dict__, which would turn the instance's attribute values into a real
+        # dict and slow every later attribute lookup on it
+        bound = getattr(original, '__self__', None) is obj and \
+            getattr(original, '__func__', None) is getattr(type(obj), method_name, None)
+        own = None if bound else original
+        stats = self.stats.setdefault(label, MethodStats())
+        clock = time.perf_counter_ns
+        # Players with per-search cache counters (MinimaxPlayer) also feed the hit rate
+        track_cache = method_name == 'get_move' and hasattr(obj, 'cache_hits') and hasattr(obj, 'cache_misses')
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = original(*args, **kwargs)
+            stats.record(clock() - start)
+            if track_cache:
+                stats.cache_hits += obj.cache_hits
+                stats.cache_misses += obj.cache_misses
+            return result
+
+        setattr(obj, method_name, timed)
+        self._wrapped.append((obj, method_name, own, timed))
+        self._timing = True
+
+    def attach(self, game=None, players=()) -> None:
+        """ Time game.make_move and get_move (and learn, if present) of every player. """
+        if game is not None:
+            self._wrap(game, 'make_move', f'{type(game).__name__}.make_move')
+        for player in players:
+            name = f'{type(player).__name__}({player.symbol.name})'
+            self._wrap(player, 'get_move', f'{name}.get_move')
+            if hasattr(player, 'learn'):
+                self._wrap(player, 'learn', f'{name}.learn')
+
+    def _set_timing(self, timing: bool) -> None:
+        """ Put the wrappers in place or take them off, they are kept for the next switch """
+        for obj, method_name, own, timed in reversed(self._wrapped):
+            if timing:
+                setattr(obj, method_name, timed)
+            # The wrappers are instance attributes, deleting them uncovers the class methods
+            elif own is None:
+                delattr(obj, method_name)
+            else:
+                setattr(obj, method_name, own)
+        self._timing = timing
+
+    def next_game(self) -> None:
+        """ Called before every game, times the first game and then one in sample_every. """
+        sampled = self.games % self.sample_every == 0
+        self.games += 1
+        self.sampled_games += sampled
+        if sampled != self._timing:
+            self._set_timing(sampled)
+
+    def detach(self) -> None:
+        """ Restore the original methods, the collected stats are kept. """
+        if self._timing:
+            self._set_timing(False)
+        self._wrapped = []
+
+    def merge(self, other: 'Instrumentation') -> None:
+        """ Add the stats and games of another Instrumentation, e.g. from a worker process. """
+        for label, stats in other.stats.items():
+            self.stats.setdefault(label, MethodStats()).merge(stats)
+        self.games += other.games
+        self.sampled_games += other.sampled_games
+
+    def summary(self) -> Dict[str, dict]:
+        return {label: stats.to_dict() for label, stats in self.stats.items()}
+
+    def report(self, file: Optional[TextIO] = None) -> None:
+        """ Print one line per instrumented method, to sys.stdout by default. """
+        if self.sampled_games < self.games:
+            print(f"Timed {self.sampled_games} of {self.games} games", file=file)
+        print(f"{'method':<40}{'calls':>10}{'total s':>10}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'cache hit':>11}", file=file)
+        for label, row in self.summary().items():
+            hit_rate = f"{row['cache_hit_rate'] * 100:.1f}%" if row['cache_hit_rate'] is not None else '-'
+            print(f"{label:<40}{row['calls']:>10}{row['total_s']:>10.3f}{row['mean_us']:>10.2f}"
+                  f"{row['p50_us']:>10.2f}{row['p99_us']:>10.2f}{hit_rate:>11}", file=file)
@@ -1,38 +1,124 @@
+from functools import lru_cache
 from typing import List, Optional, Tuple
+from game.encoding import cell_powers
+
+
+@lru_cache(maxsize=None)
+def build_lines(rows: int, cols: int, win_length: int) -> Tuple[List[List[Tuple[int, int]]], List[List[List[int]]]]:
+    """Every run of win_length cells on a rows x cols board, and the indices of the runs through each cell"""
+    lines: List[List[Tuple[int, int]]] = []
+    directions = ((0, 1), (1, 0), (1, 1), (1, -1))  # Rows, columns, diagonals, anti-diagonals
+    for d_row, d_col in directions:
+        for row in range(rows):
+            for col in range(cols):
+                end_row = row + d_row * (win_length - 1)
+                end_col = col + d_col * (win_length - 1)
+                if 0 <= end_row < rows and 0 <= end_col < cols:
+                    lines.append([(row + d_row * i, col + d_col * i) for i in range(win_length)])
+
+    cell_lines: List[List[List[int]]] = [[[] for _ in range(cols)] for _ in range(rows)]
+    for i, line in enumerate(lines):
+        for row, col in line:
+            cell_lines[row][col].append(i)
+    return lines, cell_lines
+
+# The 8 winning lines of the classic board as lists of (row, col) cells, and the
+# indices of the lines passing through each cell
+LINES, CELL_LINES = build_lines(3, 3, 3)
 
 class TicTacToe:
-    """Core game logic for Tic Tac Toe"""
+    """Core game logic for Tic Tac Toe, and m,n,k games in general
 
-    def __init__(self) -> None:
-        self.board: List[List[int]] = [[0 for _ in range(3)] for _ in range(3)]
+    The board has `rows` x `cols` cells and `win_length` in a row wins, the
+    defaults give the classic game. Per-line counters and the number of empty
+    cells are kept up to date on every move, so the board should only be
+    changed through make_move, push and pop. The same goes for the base-3 code
+    of the board in state_code (see game/encoding.py), cell i weighs 3**i in
+    row-major order.
+    """
+
+    def __init__(self, rows: int = 3, cols: int = 3, win_length: int = 3) -> None:
+        if win_length > max(rows, cols):
+            raise ValueError("win_length does not fit on the board")
+
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self._lines, self._cell_lines = build_lines(rows, cols, win_length)
+
+        self.board: List[List[int]] = [[0 for _ in range(cols)] for _ in range(rows)]
         self.current_player: int = 1
         self.game_over: bool = False
         self.winner: Optional[int] = None
+
+        # Number of cells each player holds on every line, index 0 is unused
+        self._line_counts: List[List[int]] = [[0] * len(self._lines) for _ in range(3)]
+        self._empty_count: int = rows * cols
+        self._move_stack: List[Tuple[int, int]] = []
+
+        # Base-3 code of the board, with the weight of every cell looked up by row and column
+        powers = cell_powers(rows * cols)
+        self._powers: List[Tuple[int, ...]] = [powers[row * cols:(row + 1) * cols] for row in range(rows)]
+        self._state_code: int = 0
     
     def make_move(self, row: int, col: int) -> bool:
         """Make a move on the board. Returns True if successful, False otherwise."""
         if not self.is_valid_move(row, col):
             return False
 
-        self.board[row][col] = self.current_player
+        self.push((row, col))
+        return True
+
+    def push(self, move: Tuple[int, int]) -> None:
+        """Play a legal move without validation. Can be undone with pop()."""
+        row, col = move
+        player = self.current_player
+        self.board[row][col] = player
+        self._empty_count -= 1
+        self._state_code += player * self._powers[row][col]
+        self._move_stack.append(move)
+
+        # Only the lines through the played cell can have been completed
+        counts = self._line_counts[player]
+        won = False
+        for line in self._cell_lines[row][col]:
+            counts[line] += 1
+            if counts[line] == self.win_length:
+                won = True
 
-        # Check for winner
-        if self.check_winner(self.current_player):
+        if won:
             self.game_over = True
-            self.winner = self.current_player
-        elif self.is_board_full():
+            self.winner = player
+        elif self._empty_count == 0:
             self.game_over = True
             self.winner = 0  # Draw
         else:
-            self.current_player = 3 - self.current_player  # Switch players
+            self.current_player = 3 - player  # Switch players
 
-        return True
+    def pop(self) -> Tuple[int, int]:
+        """Undo the last move and return it"""
+        move = self._move_stack.pop()
+        row, col = move
+        player = self.board[row][col]
+        self.board[row][col] = 0
+        self._empty_count += 1
+        self._state_code -= player * self._powers[row][col]
+
+        counts = self._line_counts[player]
+        for line in self._cell_lines[row][col]:
+            counts[line] -= 1
+
+        # A move can only be made in an unfinished game, with the mover to play
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        return move
 
     def is_valid_move(self, row: int, col: int) -> bool:
         """Check if a move is valid"""
         if self.game_over:
             return False
-        if row < 0 or row >= 3 or col < 0 or col >= 3: # Check if move is inside the board.
+        if row < 0 or row >= self.rows or col < 0 or col >= self.cols: # Check if move is inside the board.
             return False
         
         return self.board[row][col] == 0 # Check if position is empty
@@ -40,52 +126,99 @@ class TicTacToe:
     def get_legal_moves(self) -> List[Tuple[int, int]]:
         """Return list of all legal moves as (row, col) tuples"""
         moves: List[Tuple[int, int]] = []
-        for row in range(3):
-            for col in range(3):
+        for row in range(self.rows):
+            for col in range(self.cols):
                 # Append only empty positions
                 if self.board[row][col] == 0:
                     moves.append((row, col))
         return moves
 
+    def get_legal_cells(self) -> List[int]:
+        """Return all legal moves as cell indices (row * cols + col), in get_legal_moves() order"""
+        cols = self.cols
+        return [row * cols + col for row in range(self.rows) for col in range(cols) if self.board[row][col] == 0]
+
     def is_board_full(self) -> bool:
         """Check if the board is completely filled"""
-        for row in range(3):
-            for col in range(3):
-                # If i empty position is found break early. 
-                if self.board[row][col] == 0:
-                    return False
-        return True
+        return self._empty_count == 0
 
     def check_winner(self, player: int) -> bool:
         """Check if the specified player has won"""
-        # Check rows
-        for row in range(3):
-            if all(self.board[row][col] == player for col in range(3)):
-                return True
-        
-        # Check columns
-        for col in range(3):
-            if all(self.board[row][col] == player for row in range(3)):
-                return True
-        
-        # Check diagonals
-        if all(self.board[i][i] == player for i in range(3)):
-            return True
-        if all(self.board[i][2-i] == player for i in range(3)):
-            return True
-        
-        return False
+        return self.win_length in self._line_counts[player]
+
+    def line_counts(self, player: int) -> List[int]:
+        """Number of cells the player holds on every winning line, read-only"""
+        return self._line_counts[player]
+
+    def get_move_history(self) -> List[Tuple[int, int]]:
+        """Moves played so far, oldest first, read-only"""
+        return self._move_stack
+
+    @property
+    def lines(self) -> List[List[Tuple[int, int]]]:
+        """All winning lines as lists of (row, col) cells, in line_counts() order"""
+        return self._lines
     
     def get_board_state(self) -> Tuple[int, ...]:
         """Return board state"""
         return tuple(cell for row in self.board for cell in row)
 
+    @property
+    def state_code(self) -> int:
+        """Base-3 code of the board, encode_state(get_board_state()) without building the tuple"""
+        return self._state_code
+
     def reset(self) -> None:
         """Reset the game to initial state"""
-        self.board = [[0 for _ in range(3)] for _ in range(3)]
+        self.board = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
         self.current_player = 1
         self.game_over = False
         self.winner = None
+        self._line_counts = [[0] * len(self._lines) for _ in range(3)]
+        self._empty_count = self.rows * self.cols
+        self._move_stack = []
+        self._state_code = 0
+
+    @classmethod
+    def from_state(cls, state: Tuple[int, ...], rows: int = 3, cols: int = 3, win_length: int = 3) -> 'TicTacToe':
+        """Build a game from a board state tuple, player 1 is assumed to have moved first
+
+        Raises ValueError for boards no game can reach by their stone counts or with two winners.
+        """
+        if len(state) != rows * cols:
+            raise ValueError("state does not match the board size")
+        ones = [i for i, cell in enumerate(state) if cell == 1]
+        twos = [i for i, cell in enumerate(state) if cell == 2]
+        if len(ones) - len(twos) not in (0, 1):
+            raise ValueError("player 1 moves first, so it holds as many stones as player 2 or one more")
+
+        game = cls(rows, cols, win_length)
+        for player, cells in ((1, ones), (2, twos)):
+            counts = game._line_counts[player]
+            for cell in cells:
+                row, col = cell // cols, cell % cols
+                game.board[row][col] = player
+                game._state_code += player * game._powers[row][col]
+                for line in game._cell_lines[row][col]:
+                    counts[line] += 1
+        game._empty_count -= len(ones) + len(twos)
+
+        # The stones in alternating order stand in for the moves, so pop() and the history length work
+        game._move_stack = [(cell // cols, cell % cols) for pair in zip(ones, twos) for cell in pair]
+        if len(ones) > len(twos):
+            game._move_stack.append((ones[-1] // cols, ones[-1] % cols))
+
+        winners = [player for player in (1, 2) if game.check_winner(player)]
+        if len(winners) > 1:
+            raise ValueError("both players hold a complete line")
+        if winners:
+            game.game_over, game.winner = True, winners[0]
+        elif game._empty_count == 0:
+            game.game_over, game.winner = True, 0
+        # Like push(), the turn stays with the last mover once the game is over
+        last_player = 1 if len(ones) > len(twos) else 2
+        game.current_player = last_player if game.game_over else 3 - last_player
+        return game
 
     def __str__(self) -> str:
         """String representation of the board for debugging"""
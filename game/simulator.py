@@ -1,19 +1,55 @@
 
 from players.player import Player
-from game.logic import TicTacToe
+from game.logic import TicTacToe, LINES
 from game.winner_state import WinnerState
 from game.symbol import Symbol
-import matplotlib.pyplot as plt
+from game.instrumentation import Instrumentation
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import copy
+import random
+import time
+
+# Cell indices of the 8 winning lines of the 3x3 board, shape (8, 3)
+LINE_CELLS = np.array([[row * 3 + col for row, col in line] for line in LINES])
+
+
+def _simulate_shard(player1, player2, player_to_track, engine, n_games, seed, n_boards=1, instrument=None):
+    """ Play one seeded shard of games.
+
+    Returns (wins, draws, losses) for the tracked player and the Instrumentation
+    of the shard, None when not instrumented or played batched. instrument is the
+    sample_every of the parent's Instrumentation, or None.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    instrumentation = Instrumentation(instrument) if instrument is not None else None
+    simulator = GameSimulator(player1, player2, n_games, player_to_track, engine, instrumentation)
+    if n_boards > 1:
+        simulator._play_batched(n_games, n_boards)
+        return simulator._n_wins, simulator._n_draws, simulator._n_losses, None
+
+    if instrumentation is not None:
+        instrumentation.attach(simulator.game, (simulator.player1, simulator.player2))
+    try:
+        simulator._play(n_games)
+    finally:
+        if instrumentation is not None:
+            instrumentation.detach()
+    return simulator._n_wins, simulator._n_draws, simulator._n_losses, instrumentation
 
 
 class GameSimulator:
     """ Simulator class to simulate games against agents. """
     
-    def __init__(self, player1: Player, player2: Player, n_simulations: int, player_to_track: Symbol):
+    def __init__(self, player1: Player, player2: Player, n_simulations: int, player_to_track: Symbol, engine=TicTacToe,
+                 instrumentation: Optional[Instrumentation] = None):
         if player1.symbol == player2.symbol: # Player cant have the same symbol.
             raise ValueError()
         
-        self.game = TicTacToe()
+        self.game = engine() # TicTacToe or any class with the same API, e.g. BitboardTicTacToe or partial(TicTacToe, 6, 7, 4).
+        self._engine = engine
         self.player1 = player1
         self.player2 = player2
         self.n_simulations = n_simulations
@@ -24,10 +60,75 @@ class GameSimulator:
         self._n_draws = 0
         self._n_losses = 0
         
+        # Timing of the last simulate() call
+        self.elapsed = 0.0
+        self.games_per_second = 0.0
+        
+        # Optional per-call timing of the players and the game, reported after simulate()
+        self.instrumentation = instrumentation
+        
         
-    def simulate(self):
-        """ Method to simulate n number of games. """
-        for i in range(self.n_simulations):
+    def simulate(self, seed=None, n_shards=1, n_workers=1, n_boards=1):
+        """ Method to simulate n number of games.
+
+        With a seed the games are split into n_shards shards, shard i seeds
+        random and np.random with seed + i and plays on its own copy of the
+        players. Shards run on n_workers processes and their counts are
+        summed, the result does not depend on n_workers. Each shard times its
+        own calls and the stats are merged into the instrumentation.
+
+        With n_boards > 1 up to n_boards games are played at the same time on
+        an array and each player picks its moves for all of them with one
+        Player.get_moves call. Only for the classic 3x3 board. Batched runs make
+        no get_move or make_move calls, so nothing is instrumented or reported.
+        """
+        if n_boards > 1 and (self.game.rows, self.game.cols, self.game.win_length) != (3, 3, 3):
+            raise ValueError("Batched simulation needs the classic 3x3 board")
+
+        start = time.perf_counter()
+
+        if seed is None and n_shards == 1 and n_workers == 1 and n_boards > 1:
+            self._play_batched(self.n_simulations, n_boards)
+        elif seed is None and n_shards == 1 and n_workers == 1:
+            if self.instrumentation is not None:
+                self.instrumentation.attach(self.game, (self.player1, self.player2))
+            try:
+                self._play(self.n_simulations)
+            finally:
+                if self.instrumentation is not None:
+                    self.instrumentation.detach()
+        else:
+            seed = 0 if seed is None else seed
+            sizes = [self.n_simulations // n_shards + (i < self.n_simulations % n_shards) for i in range(n_shards)]
+            instrument = self.instrumentation.sample_every if self.instrumentation is not None else None
+            shards = [(self.player1, self.player2, self._tracked_player, self._engine, size, seed + i, n_boards, instrument)
+                      for i, size in enumerate(sizes)]
+
+            if n_workers > 1:
+                with ProcessPoolExecutor(n_workers) as pool:
+                    counts = list(pool.map(_simulate_shard, *zip(*shards)))
+            else:
+                counts = [_simulate_shard(*copy.deepcopy(shard[:3]), *shard[3:]) for shard in shards]
+
+            for wins, draws, losses, instrumentation in counts:
+                self._n_wins += wins
+                self._n_draws += draws
+                self._n_losses += losses
+                if instrumentation is not None:
+                    self.instrumentation.merge(instrumentation)
+
+        self.elapsed = time.perf_counter() - start
+        self.games_per_second = self.n_simulations / self.elapsed if self.elapsed > 0 else float('inf')
+
+        if self.instrumentation is not None and n_boards == 1:
+            self.instrumentation.report()
+
+
+    def _play(self, n_games):
+        """ Play n_games on self.game and count the results for the tracked player. """
+        for i in range(n_games):
+            if self.instrumentation is not None:
+                self.instrumentation.next_game()
             while self.game.game_over == False: 
                 move = None
                 
@@ -54,19 +155,65 @@ class GameSimulator:
 
             self.game.reset()  
 
+
+    def _play_batched(self, n_games, n_boards):
+        """ Same as _play with up to n_boards games at a time on a (n_boards, 9) array. """
+        n_boards = min(n_boards, n_games)
+        boards = np.zeros((n_boards, 9), dtype=np.int8)
+        current = np.full(n_boards, Symbol.X, dtype=np.int8)
+        active = np.ones(n_boards, dtype=bool)
+        games_started = n_boards
+
+        while active.any():
+            # Every active board gets one move, from whichever player is to move on it
+            for player in (self.player1, self.player2):
+                turn = np.flatnonzero(active & (current == player.symbol))
+                if len(turn):
+                    view = boards[turn]
+                    boards[turn, player.get_moves(view, view == 0)] = player.symbol
+
+            # Only the player who just moved can have won
+            won = (boards[:, LINE_CELLS] == current[:, None, None]).all(axis=2).any(axis=1) & active
+            full = (boards != 0).all(axis=1) & active
+            done = np.flatnonzero(won | full)
+            tracked_won = won[done] & (current[done] == self._tracked_player)
+            current = np.where(active, 3 - current, current).astype(np.int8)
+
+            if len(done):
+                self._n_wins += int(tracked_won.sum())
+                self._n_draws += int((~won[done]).sum())
+                self._n_losses += int((won[done] & ~tracked_won).sum())
+
+                # Finished boards start a new game, or retire once n_games have been started
+                restart = done[:max(0, n_games - games_started)]
+                games_started += len(restart)
+                active[done[len(restart):]] = False
+                boards[restart] = 0
+                current[restart] = Symbol.X
+
         
     
+    def summary(self) -> str:
+        """ Wins, draws and losses for the tracked agent as one line of text, for runs without plots. """
+        return f'Against {self._opponent_name}: {self._n_wins} wins, {self._n_draws} draws, {self._n_losses} losses'
+
+    @property
+    def _opponent_name(self) -> str:
+        opponent = self.player1 if self.player1.symbol != self._tracked_player else self.player2
+        return type(opponent).__name__
+
     def plot(self):
         """ Method to plot wins, draws and losses for the tracked agent. """
+        # Imported here, matplotlib takes longer to import than most simulations take to run
+        import matplotlib.pyplot as plt
+
         categories = ['Wins', 'Draws', 'Losses']
         values = [self._n_wins, self._n_draws, self._n_losses]
         
         plt.figure(figsize=(8, 5))
         plt.bar(categories, values, color=['green', 'blue', 'red'])
         
-        tracked_player = self.player1 if self.player1.symbol != self._tracked_player else self.player2
-        
-        plt.title(f'Game Results against: {type(tracked_player).__name__}')
+        plt.title(f'Game Results against: {self._opponent_name}')
         plt.ylabel('Count')
         
         for i, v in enumerate(values):
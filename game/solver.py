@@ -0,0 +1,158 @@
+""" Solve the full Tic Tac Toe game tree once and store the result.
+
+Run from the repository root to (re)build the table:
+    python -m game.solver models/solution_table.npz
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from game.logic import TicTacToe
+from game.encoding import N_CODES, POWERS, State, as_code
+import numpy as np
+import sys
+
+DEFAULT_SOLUTION_PATH = 'models/solution_table.npz'
+
+
+def solve() -> Dict[str, np.ndarray]:
+    """Walk every reachable position and return the solution arrays, indexed by board code.
+
+    value:     1 win, 0 draw, -1 loss for the player to move (terminal positions are
+               scored for the player who would move next)
+    best:      bitmask over cells 0-8 of the optimal moves, fastest win or slowest loss
+    distance:  plies until the game ends under optimal play
+    reachable: whether the code is a position reachable from the empty board
+    """
+    value = np.zeros(N_CODES, dtype=np.int8)
+    best = np.zeros(N_CODES, dtype=np.uint16)
+    distance = np.zeros(N_CODES, dtype=np.int8)
+    reachable = np.zeros(N_CODES, dtype=bool)
+
+    game = TicTacToe()
+
+    def search(code: int) -> Tuple[int, int]:
+        """Return (value, distance) for the player to move, filling the arrays"""
+        if reachable[code]:
+            return int(value[code]), int(distance[code])
+        reachable[code] = True
+
+        if game.game_over:
+            # The player who just moved either won, or the board is full
+            result = (-1 if game.winner else 0, 0)
+            value[code], distance[code] = result
+            return result
+
+        player = game.current_player
+        children = []
+        for row, col in game.get_legal_moves():
+            cell = row * 3 + col
+            game.push((row, col))
+            child_value, child_distance = search(code + player * 3 ** cell)
+            game.pop()
+            children.append((cell, -child_value, child_distance + 1))
+
+        best_value = max(child[1] for child in children)
+        optimal = [child for child in children if child[1] == best_value]
+        # Win as fast as possible, lose as slowly as possible
+        pick = min if best_value > 0 else max
+        best_distance = pick(child[2] for child in optimal)
+
+        mask = 0
+        for cell, _, child_distance in optimal:
+            if child_distance == best_distance:
+                mask |= 1 << cell
+
+        value[code], best[code], distance[code] = best_value, mask, best_distance
+        return best_value, best_distance
+
+    search(0)
+    return {'value': value, 'best': best, 'distance': distance, 'reachable': reachable}
+
+
+@lru_cache(maxsize=None)
+def reachable_codes() -> np.ndarray:
+    """Sorted board codes of every position reachable from the empty board"""
+    return np.flatnonzero(solve()['reachable']).astype(np.int32)
+
+
+def save_solution(path: str, solution: Dict[str, np.ndarray]) -> None:
+    """Save the solution arrays in a compressed npz file"""
+    np.savez_compressed(path, **solution)
+
+
+class SolutionTable:
+    """ Read-only solved game, every query is a single array lookup. """
+
+    def __init__(self, path: str = DEFAULT_SOLUTION_PATH) -> None:
+        with np.load(path) as data:
+            self.value = data['value']
+            self.best = data['best']
+            self.distance = data['distance']
+            self.reachable = data['reachable']
+
+        # Lowest optimal cell per position, -1 where there is no move
+        lowest_cell = np.array([(mask & -mask).bit_length() - 1 for mask in range(512)], dtype=np.int8)
+        self.best_cell = lowest_cell[self.best]
+
+    def best_move(self, state: State) -> Optional[Tuple[int, int]]:
+        """Return an optimal (row, col) move, or None for terminal or unknown positions"""
+        cell = int(self.best_cell[as_code(state)])
+        if cell < 0:
+            return None
+        return cell // 3, cell % 3
+
+    def best_cells(self, codes: np.ndarray, legal: Optional[np.ndarray] = None) -> np.ndarray:
+        """Lowest optimal cell of every board code, -1 where there is no move
+
+        legal is an optional (n, 9) bool mask of the cells each board may choose from.
+        The legal cells are then ranked the same way solve() ranks all empty cells,
+        by the value and distance of the position each one leads to.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        cells = self.best_cell[codes].astype(np.int64)
+        if legal is None:
+            return cells
+
+        # A legal lowest optimal cell is also the lowest optimal legal one, only the other boards
+        # are ranked. Finished boards have no optimal cells (-1), even with empty cells left
+        narrowed = np.flatnonzero((cells >= 0) & ~legal[np.arange(len(codes)), cells])
+        if len(narrowed) == 0:
+            return cells
+        codes, legal = codes[narrowed], legal[narrowed]
+
+        powers = np.array(POWERS, dtype=np.int64)
+        stones = (codes[:, None] // powers) % 3
+        player = np.where((stones == 1).sum(axis=1) == (stones == 2).sum(axis=1), 1, 2)
+        children = np.where(legal, codes[:, None] + player[:, None] * powers, 0)
+
+        # Win as fast as possible, lose or draw as slowly as possible, as in solve()
+        value = -self.value[children].astype(np.int64)
+        distance = self.distance[children].astype(np.int64) + 1
+        score = np.where(legal, value * 32 + np.where(value > 0, -distance, distance), np.iinfo(np.int64).min)
+        cells[narrowed] = np.where(legal.any(axis=1), np.argmax(score, axis=1), -1)
+        return cells
+
+    def best_moves(self, state: State) -> List[Tuple[int, int]]:
+        """Return every optimal (row, col) move"""
+        mask = int(self.best[as_code(state)])
+        return [(cell // 3, cell % 3) for cell in range(9) if mask >> cell & 1]
+
+    def position_value(self, state: State) -> int:
+        """Return 1, 0 or -1 for the player to move"""
+        return int(self.value[as_code(state)])
+
+    def distance_to_end(self, state: State) -> int:
+        """Return the number of plies until the game ends under optimal play"""
+        return int(self.distance[as_code(state)])
+
+
+@lru_cache(maxsize=None)
+def load_solution_table(path: str = DEFAULT_SOLUTION_PATH) -> SolutionTable:
+    """Load a solution table once per process, all players share the same instance"""
+    return SolutionTable(path)
+
+
+if __name__ == '__main__':
+    output = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOLUTION_PATH
+    solution = solve()
+    save_solution(output, solution)
+    print(f"Solved {int(solution['reachable'].sum())} positions, saved to {output}")
@@ -0,0 +1,84 @@
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Tuple
+from game.encoding import N_CELLS, N_CODES
+import numpy as np
+
+def _permutation(transform) -> Tuple[int, ...]:
+    """Cell permutation where transformed_state[i] = state[perm[i]]"""
+    perm = []
+    for row in range(3):
+        for col in range(3):
+            src_row, src_col = transform(row, col)
+            perm.append(src_row * 3 + src_col)
+    return tuple(perm)
+
+# The 8 symmetries of the square board (rotations and reflections), identity first
+PERMUTATIONS: List[Tuple[int, ...]] = [
+    _permutation(lambda r, c: (r, c)),          # Identity
+    _permutation(lambda r, c: (2 - c, r)),      # Rotate 90
+    _permutation(lambda r, c: (2 - r, 2 - c)),  # Rotate 180
+    _permutation(lambda r, c: (c, 2 - r)),      # Rotate 270
+    _permutation(lambda r, c: (r, 2 - c)),      # Mirror left-right
+    _permutation(lambda r, c: (2 - r, c)),      # Mirror up-down
+    _permutation(lambda r, c: (c, r)),          # Transpose
+    _permutation(lambda r, c: (2 - c, 2 - r)),  # Anti-transpose
+]
+
+# itemgetter applies a permutation to a 9-tuple without a Python level loop
+_GETTERS = [itemgetter(*perm) for perm in PERMUTATIONS]
+
+# Where each original cell ends up under each transform
+_FORWARD: List[Tuple[int, ...]] = [
+    tuple(perm.index(cell) for cell in range(9)) for perm in PERMUTATIONS
+]
+
+
+def canonical_state(state: Tuple[int, ...]) -> Tuple[Tuple[int, ...], int]:
+    """Return the smallest symmetric form of a board state and the transform that produced it"""
+    best = state
+    best_transform = 0
+    for transform in range(1, 8):
+        candidate = _GETTERS[transform](state)
+        if candidate < best:
+            best = candidate
+            best_transform = transform
+    return best, best_transform
+
+
+def transform_move(move: Tuple[int, int], transform: int) -> Tuple[int, int]:
+    """Map a (row, col) move from the original board into the transformed board"""
+    cell = _FORWARD[transform][move[0] * 3 + move[1]]
+    return cell // 3, cell % 3
+
+
+def inverse_transform_move(move: Tuple[int, int], transform: int) -> Tuple[int, int]:
+    """Map a (row, col) move from the transformed board back to the original board"""
+    cell = PERMUTATIONS[transform][move[0] * 3 + move[1]]
+    return cell // 3, cell % 3
+
+
+@lru_cache(maxsize=None)
+def canonical_code_table() -> Tuple[np.ndarray, np.ndarray]:
+    """canonical_state for every board code (see game/encoding.py) at once, the canonical code and transform by code"""
+    cells = np.arange(N_CODES)[:, None] // 3 ** np.arange(N_CELLS) % 3
+    transformed = cells[:, PERMUTATIONS]  # (codes, 8 transforms, 9 cells)
+
+    # Tuples compare from the first cell on, weighing it the most gives the same order.
+    # argmin takes the first of equal forms, as canonical_state keeps the earliest transform
+    transforms = np.argmin(transformed @ 3 ** np.arange(N_CELLS - 1, -1, -1), axis=1)
+    canonical = transformed[np.arange(N_CODES), transforms] @ 3 ** np.arange(N_CELLS)
+    return canonical.astype(np.int32), transforms.astype(np.int8)
+
+
+@lru_cache(maxsize=None)
+def _canonical_code_lists() -> Tuple[List[int], List[int]]:
+    # Indexing a list is quicker than indexing an array for a single code
+    canonical, transforms = canonical_code_table()
+    return canonical.tolist(), transforms.tolist()
+
+
+def canonical_code(code: int) -> Tuple[int, int]:
+    """canonical_state for a board code, returns the canonical code and the transform"""
+    canonical, transforms = _canonical_code_lists()
+    return canonical[code], transforms[code]
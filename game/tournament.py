@@ -0,0 +1,163 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+from players.player import Player
+from game.logic import TicTacToe
+from game.symbol import Symbol
+import numpy as np
+import csv
+import json
+import random
+import time
+
+# Seats of the current worker process: (player index, symbol) -> player, set by the pool initializer
+_worker_seats: Dict = {}
+
+
+def _init_worker(seats: Dict) -> None:
+    global _worker_seats
+    _worker_seats = seats
+
+
+def _play_match(x_index: int, o_index: int, n_games: int, seed: int, engine=TicTacToe):
+    """ Play n_games with player x_index as X (first) and o_index as O.
+
+    Returns (x_wins, draws, o_wins, x_latencies, o_latencies), latencies in seconds per move.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    players = {Symbol.X: _worker_seats[(x_index, Symbol.X)], Symbol.O: _worker_seats[(o_index, Symbol.O)]}
+    latencies = {Symbol.X: [], Symbol.O: []}
+    results = {Symbol.X: 0, 0: 0, Symbol.O: 0}
+
+    game = engine()
+    for _ in range(n_games):
+        while not game.game_over:
+            player = players[game.current_player]
+            start = time.perf_counter()
+            move = player.get_move(game)
+            latencies[player.symbol].append(time.perf_counter() - start)
+            game.make_move(*move)
+        results[game.winner] += 1
+        game.reset()
+
+    return results[Symbol.X], results[0], results[Symbol.O], latencies[Symbol.X], latencies[Symbol.O]
+
+
+def estimate_elo(scores: np.ndarray, games: np.ndarray, n_iterations: int = 2000) -> np.ndarray:
+    """ Maximum likelihood Elo ratings from a score matrix, averaged to 1500.
+
+    scores[i, j] is the points of i against j (win 1, draw 0.5) over games[i, j] games.
+    Every pairing gets one extra virtual draw so unbeaten players get a finite rating.
+    """
+    scores = scores + 0.5 * (games > 0)
+    games = games + (games > 0)
+    ratings = np.zeros(len(scores))
+    for _ in range(n_iterations):
+        expected = 1 / (1 + 10 ** ((ratings[None, :] - ratings[:, None]) / 400))
+        gradient = (scores - games * expected).sum(axis=1)
+        ratings += 10 * gradient / np.maximum(games.sum(axis=1), 1)
+        ratings -= ratings.mean()
+    return ratings + 1500
+
+
+class Tournament:
+    """ Round-robin between players, every pairing is played from both sides. """
+
+    # players: List[Player] - Any players, their symbol is changed per seat with Player.with_symbol
+    # n_games: int - Games per pairing and side
+    # names: List[str] - Optional display names, defaults to the class names
+    def __init__(self, players: Sequence[Player], n_games: int, names: Optional[List[str]] = None,
+                 seed: int = 0, n_workers: int = 1):
+        if len(players) < 2:
+            raise ValueError("A tournament needs at least two players")
+
+        self.players = list(players)
+        self.n_games = n_games
+        self.seed = seed
+        self.n_workers = n_workers
+        self.names = names or self._default_names()
+
+        # Filled by run()
+        self.matches: List[dict] = []
+        self.results = np.zeros((len(players), len(players), 3), dtype=np.int64)  # wins, draws, losses of i vs j
+        self.elo = np.zeros(len(players))
+        self.latency: List[dict] = []
+
+    def _default_names(self) -> List[str]:
+        names = []
+        for player in self.players:
+            name = type(player).__name__
+            count = sum(existing.split('#')[0] == name for existing in names)
+            names.append(name if count == 0 else f'{name}#{count + 1}')
+        return names
+
+    def run(self) -> None:
+        """ Play all pairings and compute the results matrix, Elo and latency percentiles. """
+        # One seat per player and side, reused for all its matches
+        seats = {(i, symbol): player.with_symbol(symbol)
+                 for i, player in enumerate(self.players) for symbol in (Symbol.X, Symbol.O)}
+        pairings = [(x, o) for x in range(len(self.players)) for o in range(len(self.players)) if x != o]
+        tasks = [(x, o, self.n_games, self.seed + k) for k, (x, o) in enumerate(pairings)]
+
+        if self.n_workers > 1:
+            with ProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=(seats,)) as pool:
+                outcomes = list(pool.map(_play_match, *zip(*tasks)))
+        else:
+            _init_worker(seats)
+            outcomes = [_play_match(*task) for task in tasks]
+
+        self.matches = []
+        self.results[:] = 0
+        latencies = [[] for _ in self.players]
+        for (x, o), (x_wins, draws, o_wins, x_times, o_times) in zip(pairings, outcomes):
+            self.matches.append({'x': self.names[x], 'o': self.names[o], 'games': self.n_games,
+                                 'x_wins': x_wins, 'draws': draws, 'o_wins': o_wins})
+            self.results[x, o] += (x_wins, draws, o_wins)
+            self.results[o, x] += (o_wins, draws, x_wins)
+            latencies[x].extend(x_times)
+            latencies[o].extend(o_times)
+
+        scores = self.results[:, :, 0] + 0.5 * self.results[:, :, 1]
+        self.elo = estimate_elo(scores, self.results.sum(axis=2))
+
+        self.latency = []
+        for times in latencies:
+            p50, p90, p99 = np.percentile(times, [50, 90, 99]) * 1e6 if times else (0.0, 0.0, 0.0)
+            self.latency.append({'moves': len(times), 'p50_us': round(float(p50), 2),
+                                 'p90_us': round(float(p90), 2), 'p99_us': round(float(p99), 2)})
+
+    def summary(self) -> List[dict]:
+        """ One row per player with totals, Elo and move latency percentiles. """
+        rows = []
+        for i, name in enumerate(self.names):
+            wins, draws, losses = (int(v) for v in self.results[i].sum(axis=0))
+            rows.append({'player': name, 'wins': wins, 'draws': draws, 'losses': losses,
+                         'elo': round(float(self.elo[i]), 1), **self.latency[i]})
+        return rows
+
+    def write_csv(self, path: str) -> None:
+        """ Write the per player summary as CSV, matches go to <path>_matches.csv. """
+        summary = self.summary()
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(summary[0]))
+            writer.writeheader()
+            writer.writerows(summary)
+
+        matches_path = path[:-4] + '_matches.csv' if path.endswith('.csv') else path + '_matches.csv'
+        with open(matches_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.matches[0]))
+            writer.writeheader()
+            writer.writerows(self.matches)
+
+    def write_json(self, path: str) -> None:
+        """ Write players, summary, matches and the results matrix as JSON. """
+        with open(path, 'w') as f:
+            json.dump({
+                'players': self.names,
+                'games_per_side': self.n_games,
+                'seed': self.seed,
+                'summary': self.summary(),
+                'matches': self.matches,
+                # results[i][j] = [wins, draws, losses] of player i against player j
+                'results': self.results.tolist(),
+            }, f, indent=2)
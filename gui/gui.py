@@ -6,29 +6,36 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pygame
 from game.logic import TicTacToe
+from game.bitboard import BitboardTicTacToe
 from players.minimax_player import MinimaxPlayer
 from players.qlearn_player import QLearnPlayer
 from players.random_player import RandomPlayer
 from players.perfect_strategy_player import PerfectStrategyPlayer
+from players.model_file import MODEL_EXTENSION
 from game.symbol import Symbol
+from concurrent.futures import ThreadPoolExecutor
 import argparse
+import copy
 import time
 
+# Posted by the AI worker thread when a move is ready
+AI_MOVE_READY = pygame.event.custom_type()
+
 class TicTacToeGUI:
     
-    def __init__(self, width=600, height=600):
+    def __init__(self, width=600, height=600, rows=3, cols=3):
         pygame.init()
         
         # Constants
-        self.WIDTH = width
-        self.HEIGHT = height
-        self.LINE_WIDTH = 15
-        self.BOARD_ROWS = 3
-        self.BOARD_COLS = 3
-        self.SQUARE_SIZE = self.WIDTH // self.BOARD_COLS
+        self.BOARD_ROWS = rows
+        self.BOARD_COLS = cols
+        self.SQUARE_SIZE = min(width // cols, height // rows)
+        self.WIDTH = self.SQUARE_SIZE * cols
+        self.HEIGHT = self.SQUARE_SIZE * rows
+        self.LINE_WIDTH = max(self.SQUARE_SIZE // 13, 1)
         self.CIRCLE_RADIUS = self.SQUARE_SIZE // 3
-        self.CIRCLE_WIDTH = 15
-        self.CROSS_WIDTH = 25
+        self.CIRCLE_WIDTH = max(self.SQUARE_SIZE // 13, 1)
+        self.CROSS_WIDTH = max(self.SQUARE_SIZE // 8, 1)
         self.SPACE = self.SQUARE_SIZE // 4
         
         # Colors
@@ -41,86 +48,119 @@ class TicTacToeGUI:
         # Screen setup
         self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
         pygame.display.set_caption('Tic Tac Toe')
-        self.screen.fill(self.BG_COLOR)
         
-        self.draw_lines()
+        # Everything that looks the same every frame is drawn once: the empty board,
+        # one sprite per symbol, the fonts and the game over overlay
+        self.background = pygame.Surface((self.WIDTH, self.HEIGHT))
+        self.background.fill(self.BG_COLOR)
+        self.draw_lines(self.background)
+        self.sprites = {Symbol.X: self._render_cross(), Symbol.O: self._render_circle()}
+        self.font = pygame.font.Font(None, 74)
+        self.small_font = pygame.font.Font(None, 36)
+        self.overlay = pygame.Surface((self.WIDTH, self.HEIGHT))
+        self.overlay.set_alpha(200)
+        self.overlay.fill((0, 0, 0))
+        self._game_over_texts = {}  # Rendered messages per winner, made the first time they are shown
+        
+        self._drawn = {}  # (row, col) -> symbol on screen, empty cells are left out
+        self._dirty = []  # Screen areas changed since the last update()
+        self._thinking = False
+        self.clear()
     
-    def draw_lines(self):
+    def draw_lines(self, surface=None):
         """Draw the grid lines"""
+        surface = self.screen if surface is None else surface
+        
         # Horizontal lines
-        pygame.draw.line(self.screen, self.LINE_COLOR, 
-                        (0, self.SQUARE_SIZE), 
-                        (self.WIDTH, self.SQUARE_SIZE), 
-                        self.LINE_WIDTH)
-        pygame.draw.line(self.screen, self.LINE_COLOR, 
-                        (0, 2 * self.SQUARE_SIZE), 
-                        (self.WIDTH, 2 * self.SQUARE_SIZE), 
-                        self.LINE_WIDTH)
+        for row in range(1, self.BOARD_ROWS):
+            pygame.draw.line(surface, self.LINE_COLOR, 
+                            (0, row * self.SQUARE_SIZE), 
+                            (self.WIDTH, row * self.SQUARE_SIZE), 
+                            self.LINE_WIDTH)
         
         # Vertical lines
-        pygame.draw.line(self.screen, self.LINE_COLOR, 
-                        (self.SQUARE_SIZE, 0), 
-                        (self.SQUARE_SIZE, self.HEIGHT), 
-                        self.LINE_WIDTH)
-        pygame.draw.line(self.screen, self.LINE_COLOR, 
-                        (2 * self.SQUARE_SIZE, 0), 
-                        (2 * self.SQUARE_SIZE, self.HEIGHT), 
-                        self.LINE_WIDTH)
+        for col in range(1, self.BOARD_COLS):
+            pygame.draw.line(surface, self.LINE_COLOR, 
+                            (col * self.SQUARE_SIZE, 0), 
+                            (col * self.SQUARE_SIZE, self.HEIGHT), 
+                            self.LINE_WIDTH)
+    
+    def _render_cross(self):
+        """X sprite the size of one square, transparent around the cross"""
+        sprite = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
+        start = self.SPACE
+        end = self.SQUARE_SIZE - self.SPACE
+        pygame.draw.line(sprite, self.CROSS_COLOR, (start, end), (end, start), self.CROSS_WIDTH)
+        pygame.draw.line(sprite, self.CROSS_COLOR, (start, start), (end, end), self.CROSS_WIDTH)
+        return sprite
+    
+    def _render_circle(self):
+        """O sprite the size of one square, transparent around the circle"""
+        sprite = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
+        center = (self.SQUARE_SIZE // 2, self.SQUARE_SIZE // 2)
+        pygame.draw.circle(sprite, self.CIRCLE_COLOR, center, self.CIRCLE_RADIUS, self.CIRCLE_WIDTH)
+        return sprite
     
     def draw_figures(self, board):
-        """Draw X's and O's based on board state"""
+        """Draw the X's and O's that changed since they were last drawn"""
         for row in range(self.BOARD_ROWS):
             for col in range(self.BOARD_COLS):
-                if board[row][col] == 2:
-                    # Draw O (circle)
-                    center = (int(col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2),
-                             int(row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2))
-                    pygame.draw.circle(self.screen, self.CIRCLE_COLOR, 
-                                     center, self.CIRCLE_RADIUS, self.CIRCLE_WIDTH)
-                
-                elif board[row][col] == 1:
-                    # Draw X (cross)
-                    start_x = col * self.SQUARE_SIZE + self.SPACE
-                    start_y = row * self.SQUARE_SIZE + self.SPACE
-                    end_x = col * self.SQUARE_SIZE + self.SQUARE_SIZE - self.SPACE
-                    end_y = row * self.SQUARE_SIZE + self.SQUARE_SIZE - self.SPACE
-                    
-                    pygame.draw.line(self.screen, self.CROSS_COLOR,
-                                   (start_x, end_y), (end_x, start_y), 
-                                   self.CROSS_WIDTH)
-                    pygame.draw.line(self.screen, self.CROSS_COLOR,
-                                   (start_x, start_y), (end_x, end_y), 
-                                   self.CROSS_WIDTH)
+                value = board[row][col]
+                if self._drawn.get((row, col), 0) != value:
+                    self._draw_cell(row, col, value)
+    
+    def _draw_cell(self, row, col, value):
+        """Redraw one square from the background and the sprite of its symbol"""
+        rect = pygame.Rect(col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE)
+        self.screen.blit(self.background, rect, rect)
+        if value:
+            self.screen.blit(self.sprites[value], rect)
+            self._drawn[(row, col)] = value
+        else:
+            self._drawn.pop((row, col), None)
+        
+        # The thinking indicator sits in the empty margin of the first square
+        if self._thinking and (row, col) == (0, 0):
+            pygame.draw.circle(self.screen, self.TEXT_COLOR, (self.SPACE // 2, self.SPACE // 2), max(self.SPACE // 4, 2))
+        self._dirty.append(rect)
+    
+    def set_thinking(self, thinking):
+        """Show or hide the dot that tells the AI is thinking"""
+        if thinking != self._thinking:
+            self._thinking = thinking
+            self._draw_cell(0, 0, self._drawn.get((0, 0), 0))
     
     def draw_game_over(self, winner):
         """Draw game over screen with winner or draw message"""
         # Semi-transparent overlay
-        overlay = pygame.Surface((self.WIDTH, self.HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-        
-        # Winner text
-        font = pygame.font.Font(None, 74)
-        if winner == 1:
-            text = font.render('O Wins!', True, self.TEXT_COLOR)
-        elif winner == 2:
-            text = font.render('X Wins!', True, self.TEXT_COLOR)
-        else:
-            text = font.render('Draw!', True, self.TEXT_COLOR)
-        
-        text_rect = text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2))
-        self.screen.blit(text, text_rect)
+        self.screen.blit(self.overlay, (0, 0))
         
-        # Restart instructions
-        small_font = pygame.font.Font(None, 36)
-        restart_text = small_font.render('Press R to Restart', True, self.TEXT_COLOR)
-        restart_rect = restart_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 50))
-        self.screen.blit(restart_text, restart_rect)
+        for text, text_rect in self._game_over_text(winner):
+            self.screen.blit(text, text_rect)
         
-        quit_text = small_font.render('Press Q to Quit', True, self.TEXT_COLOR)
-        quit_rect = quit_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 90))
-        self.screen.blit(quit_text, quit_rect)
+        self._dirty.append(self.screen.get_rect())
+    
+    def _game_over_text(self, winner):
+        """Rendered winner, restart and quit messages with their positions"""
+        if winner not in self._game_over_texts:
+            # Winner text
+            if winner == Symbol.X:
+                text = self.font.render('X Wins!', True, self.TEXT_COLOR)
+            elif winner == Symbol.O:
+                text = self.font.render('O Wins!', True, self.TEXT_COLOR)
+            else:
+                text = self.font.render('Draw!', True, self.TEXT_COLOR)
+            
+            # Restart and quit instructions
+            restart_text = self.small_font.render('Press R to Restart', True, self.TEXT_COLOR)
+            quit_text = self.small_font.render('Press Q to Quit', True, self.TEXT_COLOR)
+            
+            self._game_over_texts[winner] = [
+                (text, text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2))),
+                (restart_text, restart_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 50))),
+                (quit_text, quit_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 + 90))),
+            ]
+        return self._game_over_texts[winner]
     
     def get_square_from_mouse(self, pos):
         """Convert mouse position to board coordinates"""
@@ -131,35 +171,88 @@ class TicTacToeGUI:
     
     def clear(self):
         """Clear the screen and redraw grid"""
-        self.screen.fill(self.BG_COLOR)
-        self.draw_lines()
+        self.screen.blit(self.background, (0, 0))
+        self._drawn = {}
+        self._dirty = [self.screen.get_rect()]
+    
+    def invalidate(self):
+        """Put the whole screen on the display again at the next update, e.g. after the window was covered"""
+        self._dirty = [self.screen.get_rect()]
     
     def update(self):
-        """Update the display"""
-        pygame.display.update()
+        """Update the display where something changed, returns False if nothing did"""
+        if not self._dirty:
+            return False
+        pygame.display.update(self._dirty)
+        self._dirty = []
+        return True
+    
+    def set_status(self, status):
+        """Show a status after the title of the window"""
+        pygame.display.set_caption(f'Tic Tac Toe - {status}' if status else 'Tic Tac Toe')
     
     def quit(self):
         """Clean up and quit pygame"""
         pygame.quit()
         sys.exit()
 
+class FrameCounter:
+    """Counts drawn frames, main loop wake-ups and the time spent drawing"""
+
+    def __init__(self):
+        self.frames = 0
+        self.wakeups = 0
+        self.frame_time = 0.0       # Seconds spent on all frames
+        self.last_frame_time = 0.0  # Seconds spent on the latest frame
+        self._start = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def record(self, seconds):
+        self.frames += 1
+        self.frame_time += seconds
+        self.last_frame_time = seconds
+
+    def summary(self):
+        elapsed = time.perf_counter() - self._start
+        cpu = time.process_time() - self._start_cpu
+        average = self.frame_time / self.frames if self.frames else 0.0
+        return (f'{self.frames} frames and {self.wakeups} wake-ups in {elapsed:.1f} s, '
+                f'{average * 1000:.2f} ms per frame, {100 * cpu / max(elapsed, 1e-9):.1f}% CPU')
+
 class GuiGameController:
-    """Controller to manage game state and GUI interactions"""
+    """Controller to manage game state and GUI interactions
+    
+    The AI's moves are computed on a worker thread from a copy of the game, so
+    the window keeps drawing and taking input while the AI thinks. The result
+    comes back as an AI_MOVE_READY event.
+    """
 
-    def __init__(self, human_symbol, agent, gui, game):
+    # ai_move_delay: float - Shortest time in seconds between the start of the AI's turn and its move on screen
+    # show_stats: bool - Show the frame time in the window title and print a summary on quit
+    def __init__(self, human_symbol, agent, gui, game, show_stats=False, ai_move_delay=0.5):
         self.gui = gui
         self.game = game
         self.human_symbol = human_symbol
         self.agent = agent
-        self.last_ai_move_time = 0
-        self.ai_move_delay = 0.5  # Delay in seconds before AI makes a move
+        self.ai_move_delay = ai_move_delay
+        self.show_stats = show_stats
+        self.frame_counter = FrameCounter()
+        self._game_over_drawn = False
+        
+        # One worker, the agent is never asked for two moves at the same time
+        self._ai_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-move')
+        self._ai_request = 0          # Id of the latest request, results of older (cancelled) ones are dropped
+        self._ai_thinking = False
+        self._ai_turn_start = 0.0     # time.monotonic() when the latest request was made
+        self._ai_move = None          # Move that is ready but held back until ai_move_delay has passed
 
     def reset_game(self):
-        """Reset the game state and GUI"""
+        """Reset the game state and GUI, a move the AI is still thinking about is cancelled"""
+        self.cancel_ai_move()
         self.game.reset()
         self.gui.clear()
-        self.last_ai_move_time = 0
-        self.gui.update()
+        self._game_over_drawn = False
+        self.render()
 
     def handle_click(self, pos):
         """Handle mouse click events"""
@@ -173,67 +266,144 @@ class GuiGameController:
         row, col = self.gui.get_square_from_mouse(pos)
         if self.game.is_valid_move(row, col):
             self.game.make_move(row, col)
-            self.gui.clear()
-            self.gui.draw_figures(self.game.board)
+            self.render()
+
+    def request_ai_move(self):
+        """Start computing the AI's move in the background"""
+        self._ai_request += 1
+        self._ai_thinking = True
+        self._ai_turn_start = time.monotonic()
+        self.gui.set_thinking(True)
+        self._ai_worker.submit(self._compute_ai_move, self._ai_request, copy.deepcopy(self.game))
 
+    def _compute_ai_move(self, request, game):
+        """Runs on the worker thread, posts the move or the error it raised"""
+        # The cancel flag is cleared here, when the search really starts, so a cancel of this
+        # request is not lost however early it came. cancel_ai_move changes the request id
+        # before cancelling, so one that came before the clear is caught by the check below
+        self.agent.clear_cancel()
+        if request != self._ai_request:
+            return
+        try:
+            move, error = self.agent.get_move(game), None
+        except Exception as e:
+            move, error = None, e
+        
+        try:
+            pygame.event.post(pygame.event.Event(AI_MOVE_READY, request=request, move=move, error=error))
+        except pygame.error:
+            pass  # The window was closed while the AI was thinking
+
+    def handle_ai_move_ready(self, event):
+        """Keep the move of the latest request until it may be played, drop cancelled ones"""
+        if event.request != self._ai_request:
+            return
+        if event.error is not None:
+            raise event.error
+        
+        self._ai_thinking = False
+        self._ai_move = event.move
+        self.gui.set_thinking(False)
+
+    def cancel_ai_move(self):
+        """Forget the AI's current move and ask the agent to stop searching for it"""
+        self._ai_request += 1
+        if self._ai_thinking:
+            self.agent.cancel()
+        self._ai_thinking = False
+        self._ai_move = None
+        self.gui.set_thinking(False)
 
     def make_ai_move(self):
-        """Make the AI player's move"""
-        if self.game.game_over:
+        """Play the AI's move once it is ready and ai_move_delay has passed, or ask for one"""
+        if self.game.game_over or self.game.current_player != self.agent.symbol:
             return
 
-        if self.game.current_player != self.agent.symbol:
+        if self._ai_move is None:
+            if not self._ai_thinking:
+                self.request_ai_move()
             return
 
-        # Get move from AI
-        move = self.agent.get_move(self.game)
-        if move:
-            row, col = move
-            self.game.make_move(row, col)
-            self.gui.clear()
-            self.gui.draw_figures(self.game.board)
+        if time.monotonic() - self._ai_turn_start < self.ai_move_delay:
+            return
+
+        row, col = self._ai_move
+        self._ai_move = None
+        self.game.make_move(row, col)
+        self.render()
+
+    def render(self):
+        """Draw what changed since the last frame and put only that on the display"""
+        start = time.perf_counter()
+        self.gui.draw_figures(self.game.board)
+        
+        if self.game.game_over and not self._game_over_drawn:
+            self.gui.draw_game_over(self.game.winner)
+            self._game_over_drawn = True
+        
+        if self.gui.update():
+            self.frame_counter.record(time.perf_counter() - start)
+            if self.show_stats:
+                counter = self.frame_counter
+                self.gui.set_status(f'frame {counter.last_frame_time * 1000:.2f} ms, {counter.frames} frames, '
+                                    f'{counter.wakeups} wake-ups')
 
-            if self.game.game_over:
-                self.gui.draw_game_over(self.game.winner)
+    def next_events(self):
+        """Sleep until an event arrives, or until a finished AI move may be played"""
+        if self._ai_move is not None:
+            wait = self._ai_turn_start + self.ai_move_delay - time.monotonic()
+            if wait <= 0:
+                return pygame.event.get()
+            # Rounded up, waking up just before the move may be played would only mean waiting again
+            first = pygame.event.wait(int(wait * 1000) + 1)
+        else:
+            # A thinking AI wakes the loop up with AI_MOVE_READY
+            first = pygame.event.wait()
+        
+        return [first] + pygame.event.get()
 
-            self.gui.update()
-            self.last_ai_move_time = time.time()
+    def quit(self):
+        """Print the frame counts if asked to and quit"""
+        self.cancel_ai_move()
+        self._ai_worker.shutdown(wait=False, cancel_futures=True)
+        if self.show_stats:
+            print(self.frame_counter.summary())
+        self.gui.quit()
 
     def run(self):
-        """Main game loop"""
-        clock = pygame.time.Clock()
+        """Main game loop, it only wakes up for events and AI moves and only draws what changed"""
+        # Mouse movement would wake the loop up all the time for nothing
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
         self.reset_game()
 
         while True:
-            current_time = time.time()
+            # Ask for the AI's move as soon as its turn starts
+            self.make_ai_move()
+
+            events = self.next_events()
+            self.frame_counter.wakeups += 1
 
-            # catch pygame events
-            for event in pygame.event.get():
+            # handle pygame events
+            for event in events:
                 if event.type == pygame.QUIT:
-                    self.gui.quit()
+                    self.quit()
+                elif event.type == AI_MOVE_READY: # the worker has finished
+                    self.handle_ai_move_ready(event)
                 elif event.type == pygame.MOUSEBUTTONDOWN and not self.game.game_over: # mouse was clicked.
                     self.handle_click(event.pos)
                 elif event.type == pygame.KEYDOWN: # Keyboard was pressed
                     if event.key == pygame.K_r: # r was clicked
                         self.reset_game()
                     elif event.key == pygame.K_q: # q was clicked
-                        self.gui.quit()
+                        self.quit()
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED): # window content was lost
+                    self.gui.invalidate()
 
-            # Make AI move if it's AI's turn
-            if not self.game.game_over:
-                if self.game.current_player == self.agent.symbol:
-                    if current_time - self.last_ai_move_time >= self.ai_move_delay:
-                        self.make_ai_move()
+            # Play the AI's move if it is ready and due
+            self.make_ai_move()
 
-            # Rendering
-            self.gui.clear()
-            self.gui.draw_figures(self.game.board)
-            
-            if self.game.game_over:
-                self.gui.draw_game_over(self.game.winner)
-            
-            self.gui.update()
-            clock.tick(60)
+            # Rendering, a no-op unless something changed
+            self.render()
 
 
 if __name__ == '__main__':
@@ -254,12 +424,33 @@ if __name__ == '__main__':
     parser.add_argument('--model', type=str, default=None,
                         help='Path to trained Q-learning model (required for qlearn agent) ex models/model.pkl')
 
+    # Choose game engine
+    parser.add_argument('--engine', type=str, choices=['list', 'bitboard'], default='list',
+                        help='Game engine backend: list (default) or bitboard')
+
+    # Board size and winning row length, only the minimax and random agents play other boards than 3x3
+    parser.add_argument('--rows', type=int, default=3, help='Number of rows (default 3)')
+    parser.add_argument('--cols', type=int, default=3, help='Number of columns (default 3)')
+    parser.add_argument('--win-length', type=int, default=3, help='Stones in a row needed to win (default 3)')
+
+    # Shortest time the AI's move takes to show up, it is computed in the background either way
+    parser.add_argument('--ai-delay', type=float, default=0.5,
+                        help='Shortest time in seconds before the AI moves, it moves as soon as it is ready with 0')
+
+    # Show the frame time in the window title and print frame and CPU counts on quit
+    parser.add_argument('--stats', action='store_true', help='Show frame times and print a summary on quit')
+
     args = parser.parse_args()
 
     # Convert player choice to Symbol
     human_symbol = Symbol.X if args.player == 'X' else Symbol.O
     agent_symbol = Symbol.O if human_symbol == Symbol.X else Symbol.X
 
+    classic = (args.rows, args.cols, args.win_length) == (3, 3, 3)
+    if not classic and (args.agent in ('qlearn', 'perfect') or args.engine == 'bitboard'):
+        print("Error: boards other than 3x3 only work with the list engine and the minimax or random agent")
+        sys.exit(1)
+
     # Create the AI agent based on choice
     agent = None
     if args.agent == 'minimax':
@@ -268,7 +459,9 @@ if __name__ == '__main__':
         if args.model is None:
             print("Error: --model argument is required when using qlearn agent")
             sys.exit(1)
-        agent = QLearnPlayer(agent_symbol, epsilon=0)
+        # Model files are memory mapped and npz files loaded as arrays, both start faster than a pickle
+        backend = 'mmap' if args.model.endswith(MODEL_EXTENSION) else 'array' if args.model.endswith('.npz') else 'dict'
+        agent = QLearnPlayer(agent_symbol, epsilon=0, backend=backend)
         agent.load(args.model)
     elif args.agent == 'random':
         agent = RandomPlayer(agent_symbol)
@@ -276,9 +469,9 @@ if __name__ == '__main__':
         agent = PerfectStrategyPlayer(agent_symbol)
 
     # Create game, GUI, and controller
-    game = TicTacToe()
-    gui = TicTacToeGUI()
-    controller = GuiGameController(human_symbol, agent, gui, game)
+    game = BitboardTicTacToe() if args.engine == 'bitboard' else TicTacToe(args.rows, args.cols, args.win_length)
+    gui = TicTacToeGUI(rows=args.rows, cols=args.cols)
+    controller = GuiGameController(human_symbol, agent, gui, game, show_stats=args.stats, ai_move_delay=args.ai_delay)
 
     # Run the game
     controller.run()
@@ -6,7 +6,12 @@ from players.qlearn_player import QLearnPlayer
 from players.random_player import RandomPlayer
 from players.perfect_strategy_player import PerfectStrategyPlayer
 from game.symbol import Symbol
+from game.tournament import Tournament
+from players.model_file import MODEL_EXTENSION
+from trainers.replay import ReplayBuffer
+from trainers.checkpoint import Checkpointer
 import argparse
+import sys
 
 # Store model path
 saved_model = 'models/model.pkl'
@@ -14,6 +19,15 @@ saved_model = 'models/model.pkl'
 # Parse arguments from command line
 parser = argparse.ArgumentParser(description='Tic Tac Toe')
 parser.add_argument('-l', '--load', type=str, default=None, help='Path to a existing model to load. If no path is given default model is loaded.')
+parser.add_argument('-t', '--tournament', type=str, default=None, help='Play a round-robin tournament instead of the simulations and write <path>.csv and <path>.json.')
+parser.add_argument('--workers', type=int, default=1, help='Number of worker processes for the tournament.')
+parser.add_argument('--replay', action='store_true', help='Train with experience replay, the model is saved as models/model.npz.')
+parser.add_argument('--games', type=int, default=100_000, help='Number of training games against each opponent.')
+parser.add_argument('--checkpoint', type=str, default=None, help='Directory to write training checkpoints to.')
+parser.add_argument('--checkpoint-every', type=int, default=10_000, help='Number of training games between checkpoints.')
+parser.add_argument('--history-log', type=str, default=None, help='CSV file to stream the training game outcomes to.')
+parser.add_argument('--headless', action='store_true', help='Print results instead of plotting them, matplotlib is never imported.')
+parser.add_argument('--resume', type=str, default=None, help='Checkpoint directory of an interrupted training run to continue, run with the same --games and --replay.')
 
 args = parser.parse_args()
 
@@ -23,40 +37,77 @@ opponent_symbol = Symbol.O
 
 # If no model is provided, we train a new model
 if args.load is None:
-    trainer = QLearnTrainer()
-    agent = QLearnPlayer(agent_symbol)
+    # A resumed run keeps writing checkpoints to the directory it was restored from
+    checkpoint_dir = args.resume if args.resume is not None else args.checkpoint
+    checkpointer = Checkpointer(checkpoint_dir, args.checkpoint_every) if checkpoint_dir is not None else None
 
-    n_epochs = 100_000
+    if args.replay:
+        # Replay learns from batches of stored transitions, which needs the array backend
+        trainer = QLearnTrainer(replay=ReplayBuffer(), checkpointer=checkpointer, history_log=args.history_log)
+        agent = QLearnPlayer(agent_symbol, backend='array')
+        saved_model = 'models/model'
+    else:
+        trainer = QLearnTrainer(checkpointer=checkpointer, history_log=args.history_log)
+        agent = QLearnPlayer(agent_symbol)
 
-    # Train against a random player first
-    trainer.train(agent, RandomPlayer(opponent_symbol), n_epochs, saved_model)
-    trainer.train(agent, PerfectStrategyPlayer(opponent_symbol), n_epochs, saved_model)
+    if args.resume is not None:
+        if not checkpointer.exists():
+            parser.error(f"There is no checkpoint to resume in {args.resume}")
+        checkpointer.restore(trainer, agent)
 
-    trainer.plot()
+    n_epochs = args.games
+
+    # Train against a random player first, games a resumed run already played are skipped
+    skip = trainer.n_games_trained
+    for opponent in (RandomPlayer(opponent_symbol), PerfectStrategyPlayer(opponent_symbol)):
+        if skip < n_epochs:
+            trainer.train(agent, opponent, n_epochs - skip, saved_model)
+        skip = max(skip - n_epochs, 0)
+
+    if not args.headless:
+        trainer.plot()
 
 else:
-    # If there is an existing model, load it
-    agent = QLearnPlayer(agent_symbol, epsilon=0)
+    # If there is an existing model, load it, model files are memory mapped instead of read
+    backend = 'mmap' if args.load.endswith(MODEL_EXTENSION) else 'array' if args.load.endswith('.npz') else 'dict'
+    agent = QLearnPlayer(agent_symbol, epsilon=0, backend=backend)
     agent.load(args.load)
 
 # Define number of simulations
 n_simulations = 100
 
+# Round-robin between all players, results are written to files instead of plotted
+if args.tournament is not None:
+    agent.epsilon = 0
+    players = [agent, RandomPlayer(opponent_symbol), PerfectStrategyPlayer(opponent_symbol), MinimaxPlayer(opponent_symbol)]
+    tournament = Tournament(players, n_simulations, n_workers=args.workers)
+    tournament.run()
+    tournament.write_csv(args.tournament + '.csv')
+    tournament.write_json(args.tournament + '.json')
+    sys.exit(0)
+
+# Plot the results, or print them in headless mode
+def report(simulator: GameSimulator):
+    if args.headless:
+        print(simulator.summary())
+    else:
+        simulator.plot()
+
 # Simulate against a random player
 opponent = RandomPlayer(opponent_symbol)
 simulator = GameSimulator(agent, opponent, n_simulations, Symbol.X)
 simulator.simulate()
-simulator.plot()
+report(simulator)
 
 # Simulate against a perfect strategy player
 opponent = PerfectStrategyPlayer(opponent_symbol)
 simulator = GameSimulator(agent, opponent, n_simulations, Symbol.X)
 simulator.simulate()
-simulator.plot()
+report(simulator)
 
 # Simulate against a minimax player
 opponent = MinimaxPlayer(opponent_symbol)
 simulator = GameSimulator(agent, opponent, n_simulations, Symbol.X)
 simulator.simulate()
-simulator.plot()
+report(simulator)
 
@@ -1,129 +1,601 @@
-from typing import Optional, Tuple, Dict
+from typing import Dict, Hashable, List, Optional, Tuple
 from players.player import Player
-from game.logic import TicTacToe
+from players.transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from game.logic import TicTacToe, build_lines
 from game.symbol import Symbol
+from game.symmetry import canonical_code, transform_move, inverse_transform_move
+from game.solver import load_solution_table
+from game.encoding import POWERS
+from concurrent.futures import ProcessPoolExecutor
 import math
+import multiprocessing
+import numpy as np
+import threading
+import time
+
+# Score of a won position, far above anything the heuristic evaluation returns.
+# Each stone on the board takes one off, so faster wins and slower losses score better
+WIN_SCORE = 10 ** 15
+
+# Killer moves remembered per remaining depth
+N_KILLERS = 2
+
+# Time budget in seconds used on boards other than 3x3 when no limit is given
+DEFAULT_TIME_BUDGET = 1.0
+
+# Boards with more cells than this only search the empty cells next to a stone
+NEIGHBOUR_MOVES_ABOVE = 25
+
+# Nodes searched between two checks of the clock
+TIME_CHECK_INTERVAL = 256
+
+
+# Best root score found so far, shared by the worker processes of a parallel search
+_worker_alpha = None
+
+
+class _SearchTimeout(Exception):
+    """Raised inside the search when the time budget is used up"""
+
+
+def _init_worker(shared_alpha) -> None:
+    global _worker_alpha
+    _worker_alpha = shared_alpha
+
+
+def _search_move(state: Tuple[int, ...], dims: Tuple[int, int, int], move: Tuple[int, int], depth: int,
+                 deadline: Optional[float], symbol: Symbol, cache_size: int):
+    """Search one root move in a worker process
+
+    Returns (score or None on timeout, nodes, cache hits, cache misses, cache entries).
+    """
+    game = TicTacToe.from_state(state, *dims)
+    player = MinimaxPlayer(symbol, cache_size)
+    player._cell_lines = build_lines(*dims)[1]
+    player._deadline = deadline
+
+    # One below the shared alpha, so a move as good as the best so far still gets its exact score
+    alpha = _worker_alpha.value - 1
+    game.push(move)
+    try:
+        value = player.minimax(game, False, alpha, math.inf, depth - 1)
+    except _SearchTimeout:
+        value = None
+
+    if value is not None and value > alpha:
+        with _worker_alpha.get_lock():
+            _worker_alpha.value = max(_worker_alpha.value, value)
+
+    return value, player.nodes_explored, player.cache_hits, player.cache_misses, player.transposition_table.items()
+
 
 class MinimaxPlayer(Player):
-    """AI using Minimax algorithm with alpha-beta pruning"""
+    """AI using Minimax algorithm with alpha-beta pruning
 
-    def __init__(self, symbol: Symbol) -> None:
+    The classic 3x3 board is searched to the end. On bigger m,n,k boards, or when
+    max_depth or time_budget is given, the player deepens the search one ply at a
+    time, scores the positions at the depth limit with evaluate() and plays the
+    best move of the deepest search that finished in time.
+    """
+
+    # max_depth: int - Optional limit on the plies searched
+    # time_budget: float - Optional limit in seconds per move, 1 second on boards other than 3x3
+    # workers: int - Processes searching the root moves at the same time, 1 searches in this process
+    def __init__(self, symbol: Symbol, cache_size: int = 100_000, solution_table: Optional[str] = None,
+                 max_depth: Optional[int] = None, time_budget: Optional[float] = None, workers: int = 1) -> None:
         super().__init__(symbol)
         self.nodes_explored = 0
-        self.move_cache: Dict[Tuple, Tuple[int, int]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.search_depth = 0  # Plies searched by the last get_move
+
+        # Move ordering state, reset for every get_move
+        self._killers: Dict[int, List[Tuple[int, int]]] = {}
+        self._history: Dict[Tuple[int, int], int] = {}
+        self._cell_lines: List[List[List[int]]] = []
+
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self._deadline: Optional[float] = None
+        self._cancelled = threading.Event()  # Set by cancel(), stays set until clear_cancel()
+
+        # Root-parallel search, the pool is started by the first search that needs it
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._shared_alpha = None
+
+        # Shared by all searches, keyed on the canonical form of the board so
+        # rotated and mirrored positions are only searched once
+        self.transposition_table = TranspositionTable(cache_size)
+
+        # Results of root searches, kept apart because the best moves stored in the cache
+        # above depend on the order positions were searched in and these do not
+        self._root_table = TranspositionTable(cache_size)
+
+        # Optional precomputed solution (see game/solver.py), answers moves without searching
+        self.solution_table = load_solution_table(solution_table) if solution_table else None
+
+
+    def with_symbol(self, symbol: Symbol) -> 'MinimaxPlayer':
+        """Same player for the other side, with its own cache since values are stored for self.symbol"""
+        player = super().with_symbol(symbol)
+        if player is not self:
+            player.transposition_table = TranspositionTable(self.transposition_table.max_size)
+            player._root_table = TranspositionTable(self._root_table.max_size)
+        return player
 
 
     def get_move(self, game: 'TicTacToe') -> Optional[Tuple[int, int]]:
         """Get best move using minimax with alpha-beta pruning"""
+        self._start_search(game)
+
+        classic = _is_classic(game)
+
+        # A solved game needs no search
+        if self.solution_table is not None and classic:
+            return self.solution_table.best_move(game.state_code)
 
-        #Check move cache first
-        board_state = game.get_board_state()
-        if board_state in self.move_cache:
-            return self.move_cache[board_state]
-            
-        self.nodes_explored = 0
-        
         legal_moves = game.get_legal_moves()
-        
-        if not legal_moves:
+
+        if not legal_moves or game.game_over:
             return None
-        
+
+        #Check the earlier root searches first, only a search to the end of the game can be reused as is
+        key, transform = self._table_key(game)
+        entry = self._root_table.get(key)
+        if entry is not None and entry.flag == EXACT and entry.best_move is not None and entry.depth >= len(legal_moves):
+            self.cache_hits += 1
+            self.search_depth = entry.depth
+            return self._from_table_move(entry.best_move, transform)
+
+        if classic and self.max_depth is None and self.time_budget is None:
+            self.search_depth = len(legal_moves)
+            try:
+                best_move, _ = self._search_root(game, legal_moves, len(legal_moves))
+            except _SearchTimeout:
+                # Without a time budget only cancel() stops the search
+                return None
+            return best_move
+
+        return self._iterative_deepening(game, legal_moves)
+
+
+    def _start_search(self, game: 'TicTacToe') -> None:
+        """Reset the counters and move ordering state for a new search of game"""
+        self.nodes_explored = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._killers = {}
+        self._history = {}
+        self._cell_lines = build_lines(game.rows, game.cols, game.win_length)[1]
+
+
+    def get_moves(self, boards: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        """Batched get_move, every distinct board is looked up or searched only once
+
+        With a solution table all boards are answered with one array lookup. Otherwise
+        each distinct board goes through get_move, whose root table answers boards
+        searched in earlier calls without searching again. A board whose best move is
+        not in legal is searched again over the legal cells only.
+        """
+        if self.solution_table is not None:
+            codes = boards.astype(np.int64) @ np.array(POWERS, dtype=np.int64)
+            return self.solution_table.best_cells(codes, legal)
+
+        # The same board with another legal mask can have another answer
+        unique, inverse = np.unique(np.hstack([boards, legal]).astype(np.int64), axis=0, return_inverse=True)
+        cells = np.empty(len(unique), dtype=np.int64)
+        for i, row in enumerate(unique):
+            board, mask = row[:9], row[9:].astype(bool)
+            row, col = self.get_move(TicTacToe.from_state(tuple(int(cell) for cell in board)))
+            # The best move of all empty cells is also the best of any legal subset holding it
+            cells[i] = row * 3 + col if mask[row * 3 + col] else self._best_legal_cell(board, mask)
+        return cells[inverse.reshape(-1)]
+
+
+    def _best_legal_cell(self, board: np.ndarray, legal: np.ndarray) -> int:
+        """Best of the legal cells of a 3x3 board, searched to the end of the game
+
+        The result is not stored at the root, which only holds best moves over all empty cells.
+        """
+        game = TicTacToe.from_state(tuple(int(cell) for cell in board))
+        moves = [(int(cell) // 3, int(cell) % 3) for cell in np.flatnonzero(legal)]
+        self._start_search(game)
+        try:
+            (row, col), _ = self._search_root(game, moves, len(game.get_legal_moves()), store=False)
+        except _SearchTimeout:
+            row, col = moves[0]  # Only cancel() stops a search without a time budget
+        return row * 3 + col
+
+
+    def cancel(self) -> None:
+        """Stop a get_move running on another thread within a few hundred nodes"""
+        # Stops the search the same way running out of time does, a timed search returns
+        # its best move so far and a full search returns None. A cancel that comes before
+        # the search has started is kept, every search stops until clear_cancel() is called
+        self._cancelled.set()
+
+
+    def clear_cancel(self) -> None:
+        """Let searches run again after cancel(), called by whoever starts the next move"""
+        self._cancelled.clear()
+
+
+    def _iterative_deepening(self, game: 'TicTacToe', legal_moves: List[Tuple[int, int]]) -> Tuple[int, int]:
+        """Search depth 1, 2, ... until the depth limit or the time budget is reached"""
+        max_depth = min(self.max_depth or len(legal_moves), len(legal_moves))
+        budget = self.time_budget
+        if budget is None and not _is_classic(game):
+            budget = DEFAULT_TIME_BUDGET
+        self._deadline = time.monotonic() + budget if budget is not None else None
+
+        moves = self._candidate_moves(game, legal_moves)
+        best_move = moves[0]  # Played if not even depth 1 finishes in time
+        self.search_depth = 0
+        try:
+            for depth in range(1, max_depth + 1):
+                try:
+                    move, value = self._search_root(game, moves, depth)
+                except _SearchTimeout:
+                    break
+
+                best_move = move
+                self.search_depth = depth
+
+                # A forced win or loss does not change with more depth
+                if _is_decided(value):
+                    break
+        finally:
+            self._deadline = None
+
+        return best_move
+
+
+    def _search_root(self, game: 'TicTacToe', legal_moves: List[Tuple[int, int]], depth: int,
+                     store: bool = True) -> Tuple[Tuple[int, int], float]:
+        """Search every root move depth plies deep, returns the best move and its value
+
+        store=False leaves the caches as they were at the root, for searches over only some of the legal moves.
+        """
         # Define variables to track best move and value
         best_move = None
         best_value = -math.inf
         alpha = -math.inf
         beta = math.inf
-        
-        # Loop through all legal moves to find the best one
-        for move in legal_moves:
-            # Simulate the move
-            row, col = move
-            # Simulate a move on the board
-            game.board[row][col] = self.symbol
-            
-            # Get the minimax value
-            value = self.minimax(game, False, alpha, beta)
-            
-            # Undo the move, since it was not a real move
-            game.board[row][col] = 0
-            
+
+        # The best move of the previous search, if any, is tried first. Killer and history
+        # scores are left out here so the root order, and with it which of several equally
+        # good moves is played, does not depend on how earlier searches went
+        key, transform = self._table_key(game)
+        entry = self._root_table.get(key)
+        table_move = self._from_table_move(entry.best_move, transform) if entry is not None else None
+        moves = self._order_moves(game, legal_moves, depth, table_move, learned=False)
+
+        if self.workers > 1 and len(moves) > 1:
+            best_move, best_value = self._search_root_parallel(game, moves, depth)
+        else:
+            # Loop through all legal moves to find the best one
+            for i, move in enumerate(moves):
+                # Simulate a move on the board
+                game.push(move)
+
+                # Get the minimax value, the move is undone even if the search runs out of time.
+                # After the first move a null window only checks whether a move is better,
+                # and only the better ones get searched again with the full window
+                try:
+                    if i == 0:
+                        value = self.minimax(game, False, alpha, beta, depth - 1)
+                    else:
+                        value = self.minimax(game, False, alpha, alpha + 1, depth - 1)
+                        if value > alpha:
+                            value = self.minimax(game, False, alpha, beta, depth - 1)
+                finally:
+                    game.pop()
+
+                # Check if this move is better than the best found so far
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+
+                # Update alpha
+                alpha = max(alpha, value)
+
+        #Cache the best move, the root is searched with a full window so the value is exact
+        if store:
+            self.transposition_table.store(key, best_value, EXACT, self._to_table_move(best_move, transform), depth)
+            self._root_table.store(key, best_value, EXACT, self._to_table_move(best_move, transform), depth)
+
+        # Return the best move we found
+        return best_move, best_value
+
+
+    def _search_root_parallel(self, game: 'TicTacToe', moves: List[Tuple[int, int]], depth: int) -> Tuple[Tuple[int, int], float]:
+        """Search the first root move here and the others at the same time in the worker pool
+
+        Workers search with the window (shared alpha - 1, inf), where the shared alpha
+        is the best exact score found so far by any of them. Every move that scores as
+        high as the best move therefore gets its exact score, and taking the first of
+        them in root order gives the same move as the serial search.
+        """
+        # Young brothers wait: the first move sets the bound the others are searched against
+        game.push(moves[0])
+        try:
+            best_value = self.minimax(game, False, -math.inf, math.inf, depth - 1)
+        finally:
+            game.pop()
+        best_move = moves[0]
+
+        pool, shared_alpha = self._worker_pool()
+        shared_alpha.value = best_value
+        state = game.get_board_state()
+        futures = [pool.submit(_search_move, state, (game.rows, game.cols, game.win_length), move, depth,
+                               self._deadline, self.symbol, self.transposition_table.max_size)
+                   for move in moves[1:]]
+        results = [future.result() for future in futures]
+
+        # Merge the workers' counters and cache entries before a timeout is passed on
+        for _, nodes, hits, misses, entries in results:
+            self.nodes_explored += nodes
+            self.cache_hits += hits
+            self.cache_misses += misses
+            for key, entry in entries:
+                self.transposition_table.store(key, *entry)
+
+        # Workers only see the deadline, a cancel() that came meanwhile is checked here
+        if self._cancelled.is_set():
+            raise _SearchTimeout()
+
+        for move, (value, *_) in zip(moves[1:], results):
+            if value is None:
+                raise _SearchTimeout()
             # Check if this move is better than the best found so far
             if value > best_value:
                 best_value = value
                 best_move = move
-            
-            # Update alpha
-            alpha = max(alpha, value)
-        
-        #Cache the best move 
-        if best_move:
-            self.move_cache[board_state] = best_move
 
-        # Return the best move we found
-        return best_move
-    
+        return best_move, best_value
+
+
+    def _worker_pool(self) -> Tuple[ProcessPoolExecutor, 'multiprocessing.sharedctypes.Synchronized']:
+        """Process pool and shared alpha of this player, started on first use"""
+        if self._pool is None:
+            self._shared_alpha = multiprocessing.Value('q', 0)
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self._shared_alpha,))
+        return self._pool, self._shared_alpha
+
 
-    def minimax(self, game: 'TicTacToe', is_maximizing: bool, alpha: float, beta: float) -> float:
+    def close(self) -> None:
+        """Shut down the worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._shared_alpha = None
+
+
+    def __getstate__(self) -> dict:
+        # Copies and pickles of the player (with_symbol, simulator shards, worker processes) start their own pool
+        # and get their own cancel flag
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_shared_alpha'] = None
+        state['_cancelled'] = None
+        return state
+
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._cancelled = threading.Event()
+
+
+    def minimax(self, game: 'TicTacToe', is_maximizing: bool, alpha: float, beta: float, depth: Optional[int] = None) -> float:
             self.nodes_explored += 1
 
-            # Terminal states checks
-            if game.check_winner(self.symbol):
-                # If the agent has won, return a higher score 
-                # This makes winning sooner better
-                return 1
-            
-            # Switch player
-            opponent = 3 - self.symbol
-
-            if game.check_winner(opponent):
-                # If the opponent has won, return a lower score
-                # This makes losing later better
-                return -1
-            
-            if game.is_board_full():
-                # If it's a draw just return 0
-                return 0
-
-            # Recursive search
+            # Terminal states checks, push() already detected wins and draws
+            if game.game_over:
+                if game.winner == 0:
+                    # If it's a draw just return 0
+                    return 0
+                # A win scores higher and a loss lower the fewer stones it took
+                score = WIN_SCORE - len(game.get_move_history())
+                # If the agent has won, return a higher score, if the opponent has won a lower one
+                return score if game.winner == self.symbol else -score
+
+            if self.nodes_explored % TIME_CHECK_INTERVAL == 0 and (
+                    self._cancelled.is_set() or self._deadline is not None and time.monotonic() > self._deadline):
+                raise _SearchTimeout()
+
             legal_moves = game.get_legal_moves()
-            
+
+            # Without a limit the search goes to the end of the game, at the limit the position is estimated
+            if depth is None:
+                depth = len(legal_moves)
+            if depth <= 0:
+                return self.evaluate(game)
+
+            # Look up the position, a bound is only used when it causes a cutoff. Only entries
+            # searched exactly as deep are used, so a score depends on the position and depth
+            # alone and not on the order positions were searched in
+            key, transform = self._table_key(game)
+            entry = self.transposition_table.get(key)
+            if entry is not None and entry.depth == depth:
+                self.cache_hits += 1
+                if entry.flag == EXACT:
+                    return entry.value
+                if entry.flag == LOWER and entry.value >= beta:
+                    return entry.value
+                if entry.flag == UPPER and entry.value <= alpha:
+                    return entry.value
+            else:
+                self.cache_misses += 1
+
+            alpha_orig = alpha
+            beta_orig = beta
+
+            # Recursive search, most promising moves first
+            table_move = self._from_table_move(entry.best_move, transform) if entry is not None and entry.best_move else None
+            legal_moves = self._order_moves(game, self._candidate_moves(game, legal_moves), depth, table_move)
+
             best_score = -math.inf if is_maximizing else math.inf
-            
+            best_move = None
+
             if is_maximizing:
                 # Attempt to maximize the score for the agent
-                for move in legal_moves:
-                    row, col = move
-                    
+                for i, move in enumerate(legal_moves):
                     # Simulate move
-                    game.board[row][col] = self.symbol
-                    # Get the minimax score from the next depth
-                    score = self.minimax(game, False, alpha, beta)
-                    # Revert the move
-                    game.board[row][col] = 0
-                    
+                    game.push(move)
+                    # Get the minimax score from the next depth, moves after the first are
+                    # tested with a null window and searched again only if they raise alpha
+                    try:
+                        if i == 0:
+                            score = self.minimax(game, False, alpha, beta, depth - 1)
+                        else:
+                            score = self.minimax(game, False, alpha, alpha + 1, depth - 1)
+                            if alpha < score < beta:
+                                score = self.minimax(game, False, alpha, beta, depth - 1)
+                    finally:
+                        # Revert the move
+                        game.pop()
+
                     # Update best score and alpha
-                    best_score = max(best_score, score)
+                    if score > best_score:
+                        best_score = score
+                        best_move = move
                     alpha = max(alpha, best_score)
-                    
+
                     if beta <= alpha:
+                        self._record_cutoff(move, depth)
                         break # Beta cutoff
             else:
                 # Attempt to minimize the score for the opponent
-                for move in legal_moves:
-                    row, col = move
-
+                for i, move in enumerate(legal_moves):
                     # Simulate move
-                    game.board[row][col] = opponent
-                    # Get the minimax score from the next depth
-                    score = self.minimax(game, True, alpha, beta)
-                    # Revert the move
-                    game.board[row][col] = 0
-                    
+                    game.push(move)
+                    # Get the minimax score from the next depth, moves after the first are
+                    # tested with a null window and searched again only if they lower beta
+                    try:
+                        if i == 0:
+                            score = self.minimax(game, True, alpha, beta, depth - 1)
+                        else:
+                            score = self.minimax(game, True, beta - 1, beta, depth - 1)
+                            if alpha < score < beta:
+                                score = self.minimax(game, True, alpha, beta, depth - 1)
+                    finally:
+                        # Revert the move
+                        game.pop()
+
                     # Update best score and beta
-                    best_score = min(best_score, score)
+                    if score < best_score:
+                        best_score = score
+                        best_move = move
                     beta = min(beta, best_score)
-                    
+
                     if beta <= alpha:
+                        self._record_cutoff(move, depth)
                         break # Alpha cutoff
-            
-            return best_score 
+
+            # Store the result with the bound it represents for the window it was searched with
+            if best_score <= alpha_orig:
+                flag = UPPER
+            elif best_score >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.transposition_table.store(key, best_score, flag, self._to_table_move(best_move, transform), depth)
+
+            return best_score
+
+
+    def evaluate(self, game: 'TicTacToe') -> float:
+        """Estimate of an unfinished position for the agent
+
+        Every line only one player has stones on is worth 10 ** stones,
+        positive for the agent and negative for the opponent.
+        """
+        score = 0
+        for mine, theirs in zip(game.line_counts(self.symbol), game.line_counts(3 - self.symbol)):
+            if theirs == 0:
+                if mine:
+                    score += 10 ** mine
+            elif mine == 0:
+                score -= 10 ** theirs
+        return score
+
+
+    def _order_moves(self, game: 'TicTacToe', moves: List[Tuple[int, int]], depth: int,
+                     table_move: Optional[Tuple[int, int]], learned: bool = True) -> List[Tuple[int, int]]:
+        """Sort moves so the ones most likely to cause a cutoff are searched first
+
+        The stored best move comes first, then moves that win, moves that block a
+        win, killer moves and moves with a high history score (unless learned
+        is False). Ties go to the cells on the most lines, the centre before
+        corners before edges.
+        """
+        player = game.current_player
+        mine = game.line_counts(player)
+        theirs = game.line_counts(3 - player)
+        needed = game.win_length - 1
+        cell_lines = self._cell_lines
+        killers = self._killers.get(depth, ()) if learned else ()
+        history = self._history if learned else {}
+
+        def priority(move: Tuple[int, int]) -> Tuple[bool, bool, bool, bool, int, int]:
+            lines = cell_lines[move[0]][move[1]]
+            wins = any(mine[line] == needed and theirs[line] == 0 for line in lines)
+            blocks = any(theirs[line] == needed and mine[line] == 0 for line in lines)
+            return move == table_move, wins, blocks, move in killers, history.get(move, 0), len(lines)
+
+        return sorted(moves, key=priority, reverse=True)
+
+
+    def _record_cutoff(self, move: Tuple[int, int], depth: int) -> None:
+        """Remember a move that caused a cutoff as killer for its depth and in the history scores"""
+        killers = self._killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[N_KILLERS:]
+        self._history[move] = self._history.get(move, 0) + depth * depth
+
+
+    def _candidate_moves(self, game: 'TicTacToe', legal_moves: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Moves worth searching, on big boards only the empty cells next to a stone"""
+        if game.rows * game.cols <= NEIGHBOUR_MOVES_ABOVE:
+            return legal_moves
+
+        history = game.get_move_history()
+        if not history:
+            return [(game.rows // 2, game.cols // 2)]
+
+        seen = set()
+        moves = []
+        for row, col in history:
+            for r in range(max(row - 1, 0), min(row + 2, game.rows)):
+                for c in range(max(col - 1, 0), min(col + 2, game.cols)):
+                    if game.board[r][c] == 0 and (r, c) not in seen:
+                        seen.add((r, c))
+                        moves.append((r, c))
+        return moves or legal_moves
+
+
+    def _table_key(self, game: 'TicTacToe') -> Tuple[Hashable, Optional[int]]:
+        """Transposition table key and the symmetry it was found with, symmetries are only used on 3x3"""
+        if _is_classic(game):
+            return canonical_code(game.state_code)
+        return (game.rows, game.cols, game.win_length, game.state_code), None
+
+
+    def _to_table_move(self, move: Optional[Tuple[int, int]], transform: Optional[int]) -> Optional[Tuple[int, int]]:
+        return move if move is None or transform is None else transform_move(move, transform)
+
+
+    def _from_table_move(self, move: Tuple[int, int], transform: Optional[int]) -> Tuple[int, int]:
+        return move if transform is None else inverse_transform_move(move, transform)
+
+
+def _is_decided(value: float) -> bool:
+    """True for the score of a forced win or loss"""
+    return abs(value) > WIN_SCORE // 2
+
+
+def _is_classic(game: 'TicTacToe') -> bool:
+    """True for the 3x3 board with three in a row"""
+    return game.rows == 3 and game.cols == 3 and game.win_length == 3
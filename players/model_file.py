@@ -0,0 +1,231 @@
+""" Versioned binary model format for Q-tables and policies, opened with numpy.memmap.
+
+Layout, all little endian:
+    header  64 bytes: magic b'TTTM', version, kind, dtype, n_cells, n_states, zero padding
+    keys    n_states uint32 base-3 board codes (see game/encoding.py), sorted
+    values  (n_states, n_cells) float32 or float64, one value per cell, -inf on occupied cells
+
+Opening a file only reads the header, keys and values are mapped read-only so
+every process that opens the same file shares its pages.
+
+Convert the pickled models and check that the converted file plays the same
+moves on every reachable board, from the repository root:
+    python -m players.model_file convert models/model.pkl [models/model.ttm]
+    python -m players.model_file verify models/model.pkl models/model.ttm
+"""
+from pathlib import Path
+from typing import Optional, Tuple
+from game.encoding import N_CELLS, POWERS, State, as_code, decode_state, encode_state
+from game.solver import reachable_codes
+import numpy as np
+import pickle
+import random
+import struct
+import sys
+
+MODEL_EXTENSION = '.ttm'
+
+MAGIC = b'TTTM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHI')
+HEADER_SIZE = 64  # The header is padded so the arrays after it stay aligned
+
+# What the values mean, stored so a loader can refuse the wrong kind of file
+KIND_Q_TABLE = 0  # Learned Q-values, a board without a row has all zero values
+KIND_POLICY = 1   # Move preferences, a board without a row has no known best move
+KIND_CANONICAL_Q_TABLE = 2  # Q-table keyed on canonical boards, see QLearnPlayer(symmetric=True)
+
+DTYPES = (np.dtype('<f4'), np.dtype('<f8'))
+
+
+class ModelFile:
+    """ Read-only, memory mapped view of a model file. """
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            magic, version, kind, dtype, n_cells, n_states = HEADER.unpack(f.read(HEADER.size))
+
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a model file")
+        if version != VERSION:
+            raise ValueError(f"{path} has model format version {version}, only version {VERSION} is supported")
+        if n_cells != N_CELLS or dtype >= len(DTYPES):
+            raise ValueError(f"{path} has an unsupported layout")
+
+        self.path = path
+        self.kind = kind
+        self.n_states = n_states
+        # Plain ndarray views of the mapping, indexing a memmap subclass is noticeably slower
+        self.keys = np.memmap(path, dtype='<u4', mode='r', offset=HEADER_SIZE, shape=(n_states,)).view(np.ndarray)
+        self.values = np.memmap(path, dtype=DTYPES[dtype], mode='r', offset=HEADER_SIZE + 4 * n_states,
+                                shape=(n_states, n_cells)).view(np.ndarray)
+
+    def rows(self, codes: np.ndarray) -> np.ndarray:
+        """Row of every board code, -1 for boards that are not in the file"""
+        codes = np.asarray(codes, dtype=np.int64)
+        rows = np.searchsorted(self.keys, codes)
+        found = rows < self.n_states
+        found[found] = self.keys[rows[found]] == codes[found]
+        return np.where(found, rows, -1)
+
+    def row(self, state: State) -> int:
+        """Row of a board state tuple or code, -1 if it is not in the file"""
+        code = as_code(state)
+        row = int(self.keys.searchsorted(code))
+        return row if row < self.n_states and self.keys[row] == code else -1
+
+    def best_cells(self, codes: np.ndarray, legal: Optional[np.ndarray] = None) -> np.ndarray:
+        """Best cell of every board code, ties go to the first cell.
+
+        legal is an optional (n, 9) bool mask of the cells each board may choose
+        from, all empty cells by default. Boards without a row get -1 in a policy
+        and the first legal cell in a Q-table, as an unseen state has only zero Q-values.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        rows = self.rows(codes)
+        known = rows >= 0
+        cells = np.full(len(codes), -1, dtype=np.int64)
+        values = self.values[rows[known]]
+        if legal is not None:
+            values = np.where(legal[known], values, -np.inf)
+        cells[known] = np.argmax(values, axis=1)
+
+        if self.kind != KIND_POLICY and not known.all():
+            if legal is not None:
+                free = legal[~known]
+            else:
+                free = (codes[~known, None] // np.array(POWERS, dtype=np.int64)) % 3 == 0
+            cells[~known] = np.where(free.any(axis=1), np.argmax(free, axis=1), -1)
+        return cells
+
+    def best_cell(self, state: State) -> int:
+        """Best cell of a board state tuple or code, see best_cells"""
+        row = self.row(state)
+        if row >= 0:
+            return int(self.values[row].argmax())
+
+        cells = decode_state(state) if not isinstance(state, tuple) else state
+        if self.kind != KIND_POLICY and 0 in cells:
+            return cells.index(0)
+        return -1
+
+    def __getstate__(self) -> dict:
+        # Pickled copies (e.g. for worker processes) map the file again instead of carrying the arrays
+        return {'path': self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state['path'])
+
+
+def write_model(path: str, keys: np.ndarray, values: np.ndarray, kind: int) -> None:
+    """Write keys and their (n, 9) values, rows are sorted by key on the way out"""
+    keys = np.asarray(keys, dtype='<u4')
+    values = np.asarray(values)
+    dtype = 1 if values.dtype == np.float64 else 0
+    order = np.argsort(keys, kind='stable')
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, kind, dtype, N_CELLS, len(keys)).ljust(HEADER_SIZE, b'\0'))
+        f.write(keys[order].tobytes())
+        f.write(values[order].astype(DTYPES[dtype]).tobytes())
+
+
+def table_rows(data: dict) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Keys, float64 cell values and kind of a QLearnPlayer dict table or a perfect policy table"""
+    keys = np.empty(len(data), dtype=np.int64)
+    values = np.full((len(data), N_CELLS), -np.inf)
+    kind = KIND_POLICY
+    for i, (state, entry) in enumerate(data.items()):
+        keys[i] = encode_state(state)
+        empty_cells = [cell for cell, value in enumerate(state) if value == 0]
+        if isinstance(entry, dict):
+            # QLearnPlayer table: {(row, col): value}, moves it never tried are worth 0
+            kind = KIND_Q_TABLE
+            values[i, empty_cells] = [entry.get((cell // 3, cell % 3), 0.0) for cell in empty_cells]
+        else:
+            # Perfect policy: values in get_legal_moves() order, i.e. empty cells row-major
+            values[i, empty_cells] = entry
+    return keys, values, kind
+
+
+def save_table(data: dict, path: str, kind: Optional[int] = None) -> None:
+    """Write a QLearnPlayer dict table or a perfect policy table as a model file
+
+    Values are stored as float32 unless rounding would change a best move, in
+    which case float64 is used. The kind is taken from the table unless given.
+    """
+    keys, values, table_kind = table_rows(data)
+    kind = table_kind if kind is None else kind
+    single = values.astype(np.float32)
+    if not np.array_equal(np.argmax(single, axis=1), np.argmax(values, axis=1)):
+        single = values
+    write_model(path, keys, single, kind)
+
+
+def convert(source: str, target: Optional[str] = None) -> str:
+    """Convert a pickled model, returns the written path"""
+    if target is None:
+        target = str(Path(source).with_suffix(MODEL_EXTENSION))
+
+    with open(source, 'rb') as f:
+        save_table(pickle.load(f), target)
+    return target
+
+
+def verify(source: str, target: str) -> Tuple[int, int]:
+    """Play every reachable unfinished board with a player loaded from the pickle and one loaded from the
+    converted file, returns (boards where their moves differ, boards checked)
+
+    The players come from their own loading code, not from table_rows, so a mistake in the conversion
+    shows up as a different move. Boards a policy does not hold get a random move from both players,
+    the random generator is seeded the same for both calls.
+    """
+    # Imported here, the players import this module
+    from game.logic import TicTacToe
+    from game.symbol import Symbol
+    from players.perfect_strategy_player import PerfectStrategyPlayer
+    from players.qlearn_player import QLearnPlayer
+
+    with open(source, 'rb') as f:
+        kind = table_rows(pickle.load(f))[2]
+    model = ModelFile(target)
+    if (model.kind == KIND_POLICY) != (kind == KIND_POLICY):
+        raise ValueError(f"{target} holds another kind of model than {source}")
+
+    if kind == KIND_POLICY:
+        players = [PerfectStrategyPlayer(Symbol.X, policy=path) for path in (source, target)]
+    else:
+        symmetric = model.kind == KIND_CANONICAL_Q_TABLE
+        players = [QLearnPlayer(Symbol.X, epsilon=0, backend=backend, symmetric=symmetric)
+                   for backend in ('dict', 'mmap')]
+        for player, path in zip(players, (source, target)):
+            player.load(path)
+
+    mismatches = 0
+    checked = 0
+    for code in reachable_codes():
+        game = TicTacToe.from_state(decode_state(int(code)))
+        if game.game_over:
+            continue
+
+        moves = []
+        for player in players:
+            random.seed(int(code))
+            moves.append(player.with_symbol(Symbol(game.current_player)).get_move(game))
+        mismatches += moves[0] != moves[1]
+        checked += 1
+    return mismatches, checked
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ('convert', 'verify') or (sys.argv[1] == 'verify' and len(sys.argv) < 4):
+        print("Usage: python -m players.model_file convert <model.pkl> [model.ttm]")
+        print("       python -m players.model_file verify <model.pkl> <model.ttm>")
+        sys.exit(1)
+
+    if sys.argv[1] == 'convert':
+        print(f"Saved {convert(*sys.argv[2:4])}")
+    else:
+        mismatches, checked = verify(sys.argv[2], sys.argv[3])
+        print(f"{mismatches} of {checked} reachable unfinished boards pick a different move")
+        sys.exit(1 if mismatches else 0)
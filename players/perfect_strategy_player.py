@@ -2,20 +2,54 @@
 from players.player import Player
 from game.symbol import Symbol
 from game.logic import TicTacToe
+from game.solver import load_solution_table
+from game.encoding import N_CODES, POWERS, encode_state
+from players.model_file import KIND_POLICY, MODEL_EXTENSION, ModelFile
+from typing import Optional
 import pickle
 import numpy as np
 import random
 
+DEFAULT_POLICY_PATH = 'models/perfect_policy' + MODEL_EXTENSION
+
 # Perfect Strategy Player using precomputed Q-Table
 class PerfectStrategyPlayer(Player):
-    def __init__(self, symbol: Symbol):
+    # policy: str - Perfect strategy table, a model file (see players/model_file.py) or the original pickle
+    def __init__(self, symbol: Symbol, solution_table: Optional[str] = None, policy: str = DEFAULT_POLICY_PATH):
         super().__init__(symbol)
 
-        # Load the perfect strategy Q-table from file
-        with open('models/perfect_policy.pkl', 'rb') as f:
+        # Use the solved game table if given (see game/solver.py), a move is a single lookup
+        self._solution_table = load_solution_table(solution_table) if solution_table else None
+        if self._solution_table is not None:
+            return
+
+        # Dense (3**9, 9) version of the Q-table for get_moves, built on first use
+        self._policy = None
+
+        # Memory map the perfect strategy table, or load the pickled Q-table
+        self._model = None
+        if policy.endswith(MODEL_EXTENSION):
+            self._model = ModelFile(policy)
+            if self._model.kind != KIND_POLICY:
+                raise ValueError(f"{policy} does not hold a policy")
+            return
+
+        with open(policy, 'rb') as f:
             self._q_table = pickle.load(f)
     
     def get_move(self, game: TicTacToe):         
+        # The solved game and model files are looked up by the game's state code, no tuple needed
+        if self._solution_table is not None:
+            return self._solution_table.best_move(game.state_code)
+
+        if self._model is not None:
+            cell = self._model.best_cell(game.state_code)
+            if cell < 0:
+                # If state not found in the table, return a random valid move
+                valid_moves = game.get_legal_moves()
+                return random.choice(valid_moves) if valid_moves else None
+            return cell // 3, cell % 3
+
         state = game.get_board_state()
         valid_moves = game.get_legal_moves()
 
@@ -41,5 +75,31 @@ class PerfectStrategyPlayer(Player):
         except KeyError:
             # If state not found in Q-table, return a random valid move
             return random.choice(valid_moves) if valid_moves else None
-        
-                
+
+    def get_moves(self, boards: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        """ Best legal move for every board, a random legal move for unknown states. """
+        codes = boards.astype(np.int64) @ np.array(POWERS, dtype=np.int64)
+        random_cells = np.argmax(np.random.random(legal.shape) * legal, axis=1)
+
+        if self._solution_table is not None:
+            cells = self._solution_table.best_cells(codes, legal)
+            return np.where(cells >= 0, cells, random_cells)
+
+        if self._model is not None:
+            cells = self._model.best_cells(codes, legal)
+            return np.where(cells >= 0, cells, random_cells)
+
+        policy = np.where(legal, self._policy_matrix()[codes], -np.inf)
+        known = np.isfinite(policy).any(axis=1)
+        return np.where(known, np.argmax(policy, axis=1), random_cells)
+
+    def _policy_matrix(self) -> np.ndarray:
+        """ Q-values spread onto board cells, -inf for illegal moves and unknown states. """
+        if self._policy is None:
+            policy = np.full((N_CODES, 9), -np.inf, dtype=np.float32)
+            for state, q_values in self._q_table.items():
+                # Q-values are stored in get_legal_moves() order, i.e. empty cells row-major
+                empty_cells = [i for i, cell in enumerate(state) if cell == 0]
+                policy[encode_state(state), empty_cells] = q_values
+            self._policy = policy
+        return self._policy
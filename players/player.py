@@ -3,6 +3,8 @@ from abc import ABC, abstractmethod
 from game.symbol import Symbol
 from game.logic import TicTacToe
 from typing import Optional, Tuple
+import numpy as np
+import copy
 
 # Abstract Player Base Class
 class Player(ABC):
@@ -16,3 +18,37 @@ class Player(ABC):
     @abstractmethod
     def get_move(self, game: TicTacToe) -> Optional[Tuple[int, int]]:
         ... 
+    
+    def cancel(self) -> None:
+        """ Ask a get_move running on another thread to return early. Players that search override this. """
+        pass
+    
+    def clear_cancel(self) -> None:
+        """ Undo cancel() before the next get_move is started. """
+        pass
+    
+    def with_symbol(self, symbol: Symbol) -> 'Player':
+        """ Same player playing the other side. Shares loaded models with this player. """
+        if symbol == self.symbol:
+            return self
+        player = copy.copy(self)
+        player.symbol = symbol
+        return player
+    
+    def get_moves(self, boards: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        """ Batched get_move for many unfinished boards at once.
+
+        boards: (n, 9) array of cell values, legal: (n, 9) bool mask of the cells
+        each board may choose from, its empty cells or some of them.
+        Returns the chosen cell (row * 3 + col) for every board, always one in legal.
+        Subclasses override this with a vectorized version, the default asks get_move
+        board by board and plays a random legal cell where get_move picks another one.
+        """
+        cells = np.empty(len(boards), dtype=np.int64)
+        for i, board in enumerate(boards):
+            row, col = self.get_move(TicTacToe.from_state(tuple(int(cell) for cell in board)))
+            cells[i] = row * 3 + col
+        outside = ~legal[np.arange(len(cells)), cells]
+        if outside.any():
+            cells[outside] = np.argmax(np.random.random(legal[outside].shape) * legal[outside], axis=1)
+        return cells
@@ -0,0 +1,171 @@
+""" Dense array backed Q-table for QLearnPlayer.
+
+Convert a pickled dict Q-table from the repository root with:
+    python -m players.q_table models/model.pkl models/model.npz
+"""
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from game.encoding import N_CODES, POWERS, State, as_code, decode_state
+from game.solver import reachable_codes
+from game.symmetry import canonical_code_table, transform_move
+from functools import lru_cache
+from players.model_file import KIND_CANONICAL_Q_TABLE, KIND_Q_TABLE, MODEL_EXTENSION, ModelFile
+import numpy as np
+import pickle
+import sys
+
+
+# Cell a move lands on under each of the 8 symmetries, shape (8, 9)
+TRANSFORMED_CELLS = np.array([[row * 3 + col for row, col in (transform_move((cell // 3, cell % 3), transform)
+                                                             for cell in range(9))]
+                              for transform in range(8)])
+
+# Inverse of TRANSFORMED_CELLS, the cell on the original board of a cell on the transformed one
+INVERSE_CELLS = np.argsort(TRANSFORMED_CELLS, axis=1)
+
+
+@lru_cache(maxsize=None)
+def canonical_map() -> Tuple[np.ndarray, np.ndarray]:
+    """Canonical code and symmetry of every reachable board, indexed by code (-1 and 0 for unreachable ones)"""
+    codes = reachable_codes()
+    all_canonical, all_transforms = canonical_code_table()
+    canonical = np.full(N_CODES, -1, dtype=np.int32)
+    transforms = np.zeros(N_CODES, dtype=np.int8)
+    canonical[codes] = all_canonical[codes]
+    transforms[codes] = all_transforms[codes]
+    return canonical, transforms
+
+
+def canonical_codes() -> np.ndarray:
+    """Sorted codes of the canonical form (see game/symmetry.py) of every reachable board"""
+    return np.unique(canonical_map()[0][reachable_codes()])
+
+
+def apply_mean_update(q: np.ndarray, rows: np.ndarray, cells: np.ndarray, delta: np.ndarray) -> None:
+    """ Add delta to q[rows, cells], averaging the deltas of repeated (row, cell) pairs. """
+    keys, inverse = np.unique(rows * 9 + cells, return_inverse=True)
+    total = np.bincount(inverse, weights=delta)
+    count = np.bincount(inverse)
+    q[keys // 9, keys % 9] += (total / count).astype(q.dtype)
+
+
+class ArrayQTable:
+    """ Q-values for every reachable state in a (n_states, 9) float32 array.
+
+    Each board is mapped to a dense row through its base-3 code, rows are in
+    sorted code order. Illegal moves (occupied cells) hold -inf so argmax and
+    max only ever see legal moves. A canonical table only has rows for the
+    canonical boards, the caller maps boards and moves onto them.
+    """
+
+    def __init__(self, canonical: bool = False) -> None:
+        self.canonical = canonical
+        self.codes = canonical_codes() if canonical else reachable_codes()
+        self.n_states = len(self.codes)
+
+        # Perfect hash from base-3 code to row, -1 for unreachable boards
+        self.state_index = np.full(N_CODES, -1, dtype=np.int32)
+        self.state_index[self.codes] = np.arange(self.n_states, dtype=np.int32)
+
+        # Cell values of every reachable board, used to build the legal move mask
+        cells = (self.codes[:, None] // np.array(POWERS, dtype=np.int32)) % 3
+        self.legal = cells == 0
+
+        self.q = np.where(self.legal, 0.0, -np.inf).astype(np.float32)
+
+    def index(self, state: State) -> int:
+        """Row of a board state tuple or code"""
+        row = self.state_index[as_code(state)]
+        if row < 0:
+            raise KeyError(state)
+        return int(row)
+
+    def lookup(self, codes: np.ndarray, cells: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Rows of an array of board codes, and the cells mapped onto those rows
+
+        The cells only change for a canonical table, where each board is first
+        turned into its canonical form.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        if self.canonical:
+            canonical, transforms = canonical_map()
+            if cells is not None:
+                cells = TRANSFORMED_CELLS[transforms[codes], cells]
+            codes = canonical[codes]
+        return self.state_index[codes], cells
+
+    def best_cell(self, row: int) -> int:
+        """Legal cell with the highest Q-value, ties go to the first cell"""
+        return int(np.argmax(self.q[row]))
+
+    def max_q(self, row: int) -> float:
+        """Highest Q-value over legal moves, 0 when there are none"""
+        value = self.q[row].max()
+        return float(value) if value != -np.inf else 0.0
+
+    @classmethod
+    def from_dict(cls, q_dict: Dict[Tuple[int, ...], Dict[Tuple[int, int], float]], canonical: bool = False) -> 'ArrayQTable':
+        """Convert a dict Q-table as used by QLearnPlayer (state -> {(row, col): value})"""
+        table = cls(canonical)
+        for state, actions in q_dict.items():
+            row = table.index(state)
+            for (move_row, move_col), value in actions.items():
+                table.q[row, move_row * 3 + move_col] = value
+        return table
+
+    def to_dict(self) -> Dict[Tuple[int, ...], Dict[Tuple[int, int], float]]:
+        """Convert back into a dict Q-table, only states with learned values are kept"""
+        q_dict = {}
+        learned = (np.where(self.legal, self.q, 0) != 0).any(axis=1)
+        for row in np.flatnonzero(learned):
+            state = decode_state(int(self.codes[row]))
+            q_dict[state] = {(cell // 3, cell % 3): float(self.q[row, cell])
+                             for cell in np.flatnonzero(self.legal[row])}
+        return q_dict
+
+    def save(self, filename: str) -> None:
+        """Save Q-values with the codes of their rows"""
+        with open(filename, 'wb+') as f:
+            np.savez(f, codes=self.codes, q=self.q)
+
+    @classmethod
+    def from_model(cls, model: ModelFile, canonical: bool = False) -> 'ArrayQTable':
+        """Copy the Q-values of a model file, boards it does not hold keep zero values"""
+        if model.kind != (KIND_CANONICAL_Q_TABLE if canonical else KIND_Q_TABLE):
+            raise ValueError(f"{model.path} does not hold a {'canonical ' if canonical else ''}Q-table")
+        table = cls(canonical)
+        rows = table.state_index[np.asarray(model.keys, dtype=np.int64)]
+        table.q[rows] = np.where(table.legal[rows], model.values, -np.inf)
+        return table
+
+    @classmethod
+    def load(cls, filename: str, canonical: bool = False) -> 'ArrayQTable':
+        """Load an npz file written by save(), a model file, or convert a pickled dict Q-table"""
+        if filename.endswith('.pkl'):
+            with open(filename, 'rb') as f:
+                return cls.from_dict(pickle.load(f), canonical)
+        if filename.endswith(MODEL_EXTENSION):
+            return cls.from_model(ModelFile(filename), canonical)
+
+        table = cls(canonical)
+        with np.load(filename) as data:
+            if not np.array_equal(data['codes'], table.codes):
+                raise ValueError(f"{filename} was saved with a different state index")
+            table.q[:] = data['q']
+        return table
+
+
+def convert(source: str, target: Optional[str] = None) -> str:
+    """Convert a pickled dict Q-table into the array format, returns the written path"""
+    if target is None:
+        target = str(Path(source).with_suffix('.npz'))
+    ArrayQTable.load(source).save(target)
+    return target
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python -m players.q_table <model.pkl> [model.npz]")
+        sys.exit(1)
+
+    print(f"Saved {convert(*sys.argv[1:3])}")
@@ -2,9 +2,16 @@ from players.player import Player
 from typing import Optional
 from game.logic import TicTacToe
 from game.symbol import Symbol
+from players.q_table import ArrayQTable, INVERSE_CELLS, apply_mean_update
+from game.encoding import POWERS, decode_state
+from game.symmetry import (PERMUTATIONS, canonical_code, canonical_code_table, canonical_state, inverse_transform_move,
+                           transform_move)
+from players.model_file import KIND_CANONICAL_Q_TABLE, KIND_Q_TABLE, MODEL_EXTENSION, ModelFile, save_table, write_model
 from collections import defaultdict
+import numpy as np
 import random
 import pickle
+import copy
 
 # Default value helper for defaultdict to be able to store a defaultdict using pickle
 def default_value():
@@ -14,17 +21,34 @@ def default_value():
 class QLearnPlayer(Player):    
     """ Q-Learning Agent to play Tic Tac Toe """
     
-    def __init__(self, symbol, learning_rate=0.1, discount_rate=0.9, epsilon=0.1):
+    # backend: 'dict' for nested dicts keyed on tuples, 'array' for a dense ArrayQTable,
+    #          'mmap' for a read-only memory mapped model file (see players/model_file.py), set by load()
+    # symmetric: bool - Store values under the canonical form of each board (see game/symmetry.py), so the
+    #            up to 8 rotations and mirrors of a position share one entry and learn together
+    def __init__(self, symbol, learning_rate=0.1, discount_rate=0.9, epsilon=0.1, backend='dict', symmetric=False):
         super().__init__(symbol)
+        if backend not in ('dict', 'array', 'mmap'):
+            raise ValueError(f"Unknown Q-table backend: {backend}")
+
         self.learning_rate = learning_rate  # α (alpha)
         self.discount_rate = discount_rate  # γ (gamma)
         self.epsilon = epsilon              # exploration rate
+        self.backend = backend
+        self.symmetric = symmetric
         
-        self._q_table = defaultdict(default_value)
+        if backend == 'array':
+            self._q_table = ArrayQTable(canonical=symmetric)
+        elif backend == 'mmap':
+            self._q_table = None  # Nothing to play with until a model file is loaded
+        else:
+            self._q_table = defaultdict(default_value)
     
     
     def get_move(self, game: TicTacToe) -> Optional[tuple[int, int]]:
         """ Get the best move using epsilon-greedy policy """
+        if self.backend != 'dict':
+            return self._get_table_move(game)
+
         state = game.get_board_state()
         moves = game.get_legal_moves()
         
@@ -33,7 +57,94 @@ class QLearnPlayer(Player):
         
         if random.random() < self.epsilon: # Make the agent explore.
             return random.choice(moves)
-        
+
+        return self._greedy_move(state, moves)
+
+    def _get_table_move(self, game: TicTacToe) -> Optional[tuple[int, int]]:
+        """ get_move for the array and mmap backends, looked up by the game's state code and cell """
+        if game.is_board_full():
+            return None
+
+        if random.random() < self.epsilon: # Make the agent explore.
+            cell = random.choice(game.get_legal_cells())
+            return cell // 3, cell % 3
+
+        code, transform = canonical_code(game.state_code) if self.symmetric else (game.state_code, 0)
+        if self.backend == 'array':
+            # Illegal moves hold -inf, so argmax over the row picks the best legal move
+            cell = self._q_table.best_cell(self._q_table.index(code))
+        else:
+            cell = self._q_table.best_cell(code)
+
+        # Back from the canonical board, the identity permutation otherwise
+        cell = PERMUTATIONS[transform][cell]
+        return cell // 3, cell % 3
+
+    def state_key(self, game: TicTacToe):
+        """ Board as learn() takes it, the state code for the array backends and the state tuple for dicts """
+        return game.get_board_state() if self.backend == 'dict' else game.state_code
+
+    def get_moves(self, boards: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        """ Batched epsilon-greedy get_move, one argmax over the Q-table rows of all boards.
+
+        Only cells in legal are chosen, unseen boards get their first legal cell.
+        The dict backend has no matrix to index and picks board by board.
+        Exploration draws from np.random instead of random.
+        """
+        if self.backend == 'dict':
+            cells = np.array([self._dict_cell(board, mask) for board, mask in zip(boards, legal)], dtype=np.int64)
+        else:
+            cells = self._table_cells(boards, legal)
+
+        explore = np.random.random(len(boards)) < self.epsilon
+        if explore.any():
+            cells[explore] = np.argmax(np.random.random(legal[explore].shape) * legal[explore], axis=1)
+        return cells
+
+    def _table_cells(self, boards: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        """ Greedy cells for the array and mmap backends """
+        codes = boards.astype(np.int64) @ np.array(POWERS, dtype=np.int64)
+        if self.symmetric:
+            # Look up the canonical boards, the same as get_move does one at a time,
+            # with the legal cells moved onto them
+            canonical, transforms = canonical_code_table()
+            transforms = transforms[codes]
+            codes = canonical[codes].astype(np.int64)
+            legal = np.take_along_axis(legal, INVERSE_CELLS[transforms], axis=1)
+
+        if self.backend == 'array':
+            # Boards without a row (-1) get the first legal cell, the same as ModelFile.best_cells
+            rows = self._q_table.state_index[codes]
+            known = rows >= 0
+            cells = np.argmax(legal, axis=1)
+            cells[known] = np.argmax(np.where(legal[known], self._q_table.q[rows[known]], -np.inf), axis=1)
+        else:
+            cells = self._q_table.best_cells(codes, legal)
+
+        if self.symmetric:
+            cells = INVERSE_CELLS[transforms, cells]
+        return cells
+
+    def _dict_cell(self, board: np.ndarray, legal: np.ndarray) -> int:
+        """ Greedy cell of one board for the dict backend, as get_move picks it but among the legal cells """
+        state = tuple(int(cell) for cell in board)
+        moves = [(int(cell) // 3, int(cell) % 3) for cell in np.flatnonzero(legal)]
+        row, col = self._greedy_move(state, moves)
+        return row * 3 + col
+
+    def _greedy_move(self, state, moves):
+        """ Best of the given moves in the dict table, looked up on the canonical board if symmetric """
+        if self.symmetric:
+            # Pick the move on the canonical board and map it back onto this one. Sorting keeps
+            # ties going to the first canonical cell, the same as argmax in the array backends
+            state, transform = canonical_state(state)
+            moves = sorted(transform_move(move, transform) for move in moves)
+            return inverse_transform_move(self._best_move(state, moves), transform)
+
+        return self._best_move(state, moves)
+
+    def _best_move(self, state, moves):
+        """ Legal move with the highest Q-value in the dict table """
         # Get the move with the highest learned Q-value for the current state
         q_values = {move: self._q_table[state][move] for move in moves}
         best_action = max(q_values, key=q_values.get)
@@ -42,6 +153,20 @@ class QLearnPlayer(Player):
     
     
     def learn(self, last_state, last_action, reward, current_state, done=False):
+        """ Q-learning update, states as state_key() returns them, the array backend also takes state tuples """
+        if self.symmetric:
+            # Update the canonical entry, with the action mapped the same way as in get_move
+            canonical = canonical_state if isinstance(last_state, tuple) else canonical_code
+            last_state, transform = canonical(last_state)
+            last_action = transform_move(last_action, transform)
+            current_state, _ = canonical(current_state)
+
+        if self.backend == 'array':
+            self._learn_array(last_state, last_action, reward, current_state, done)
+            return
+        if self.backend == 'mmap':
+            raise TypeError("A memory mapped Q-table is read-only, use the 'array' or 'dict' backend to train")
+
         # Get Q value from the last state
         last_q = self._q_table[last_state][last_action]
         
@@ -63,14 +188,110 @@ class QLearnPlayer(Player):
         # Update the last state in the Q-table with the new Q value
         self._q_table[last_state][last_action] = new_q
     
+    def _learn_array(self, last_state, last_action, reward, current_state, done):
+        """ Same update as learn(), as indexing into the ArrayQTable """
+        table = self._q_table
+        row = table.index(last_state)
+        cell = last_action[0] * 3 + last_action[1]
+        
+        if done:
+            table.q[row, cell] = reward
+            return
+        
+        max_current_q = table.max_q(table.index(current_state))
+        last_q = table.q[row, cell]
+        table.q[row, cell] = last_q + self.learning_rate * (reward + self.discount_rate * max_current_q - last_q)
+    
+    def learn_batch(self, states, actions, rewards, next_states, dones, weights=None):
+        """ Vectorized learn() over arrays of transitions, needs the 'array' backend.
+
+        States are base-3 board codes (see game/encoding.py) and actions cell
+        indices. Repeated (state, action) pairs get the mean of their updates,
+        weights scale each update (e.g. importance weights of a prioritized
+        replay buffer). Returns the TD errors before the update.
+        """
+        if self.backend != 'array':
+            raise TypeError("learn_batch needs a QLearnPlayer with backend='array'")
+
+        table = self._q_table
+        rows, cells = table.lookup(states, actions)
+        next_rows, _ = table.lookup(next_states)
+
+        # Same targets as learn(): the reward alone when done, otherwise reward plus the discounted best next value
+        next_q = table.q[next_rows].max(axis=1)
+        next_q = np.where(np.isfinite(next_q) & ~dones, next_q, 0.0)
+        td_errors = rewards + self.discount_rate * next_q - table.q[rows, cells]
+
+        # learn() sets a finished game's value outright, other steps move by the learning rate
+        step = np.where(dones, 1.0, self.learning_rate) * td_errors
+        if weights is not None:
+            step = step * weights
+        apply_mean_update(table.q, rows, cells, step)
+        return td_errors
+
+    def snapshot(self) -> 'QLearnPlayer':
+        """ Copy of this player with its own Q-table, e.g. to save while this one keeps learning """
+        player = copy.copy(self)
+        if self.backend == 'array':
+            player._q_table = copy.deepcopy(self._q_table)
+        elif self.backend == 'dict':
+            # Copying the inner dicts is enough, the values are floats
+            player._q_table = defaultdict(default_value, {state: values.copy() for state, values in self._q_table.items()})
+        return player
+
     def load(self, filename):
-        """ Load Q-table from file """
+        """ Load Q-table from file, pickled dict tables and model files are converted to the backend """
+        if self.backend == 'array':
+            self._q_table = ArrayQTable.load(filename, canonical=self.symmetric)
+            return
+
+        if self.backend == 'mmap':
+            if not filename.endswith(MODEL_EXTENSION):
+                raise ValueError(f"The mmap backend needs a {MODEL_EXTENSION} model file, convert with python -m players.model_file")
+            self._q_table = ModelFile(filename)
+            if self._q_table.kind != self._model_kind:
+                raise ValueError(f"{filename} does not hold a {'canonical ' if self.symmetric else ''}Q-table")
+            return
+
+        if filename.endswith(MODEL_EXTENSION):
+            model = ModelFile(filename)
+            if model.kind != self._model_kind:
+                raise ValueError(f"{filename} does not hold a {'canonical ' if self.symmetric else ''}Q-table")
+            self._q_table = defaultdict(default_value)
+            for code, values in zip(model.keys, model.values):
+                state = decode_state(int(code))
+                self._q_table[state] = defaultdict(float, {(cell // 3, cell % 3): float(values[cell])
+                                                           for cell, value in enumerate(state) if value == 0})
+            return
+
         with open(filename, 'rb') as f:
             self._q_table = pickle.load(f)
     
     
     def save(self, filename):
-        """ Save Q-table to file """
+        """ Save Q-table to file, as a model file if filename ends with .ttm """
+        if self.backend == 'mmap':
+            write_model(filename, self._q_table.keys, self._q_table.values, self._model_kind)
+            return
+
+        if filename.endswith(MODEL_EXTENSION):
+            q_table = self._q_table.to_dict() if self.backend == 'array' else self._q_table
+            save_table(q_table, filename, self._model_kind)
+            return
+
+        if self.backend == 'array':
+            self._q_table.save(filename)
+            return
+
         with open(filename, 'wb+') as f:
             pickle.dump(self._q_table, f)
 
+    @property
+    def _model_kind(self):
+        return KIND_CANONICAL_Q_TABLE if self.symmetric else KIND_Q_TABLE
+
+    @property
+    def model_extension(self):
+        """ File extension used when saving this player's Q-table """
+        return {'array': '.npz', 'mmap': MODEL_EXTENSION}.get(self.backend, '.pkl')
+
@@ -1,6 +1,7 @@
 # Import Modules
 from players.player import Player
 from game.logic import TicTacToe
+import numpy as np
 import random
 
 class RandomPlayer(Player):
@@ -11,4 +12,9 @@ class RandomPlayer(Player):
         moves = game.get_legal_moves()
         if moves: 
             return random.choice(moves)
-        return None
\ No newline at end of file
+        return None
+    
+    def get_moves(self, boards: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        """ Uniform random legal cell for every board. """
+        # Random scores on legal cells only, the largest one is a uniform pick
+        return np.argmax(np.random.random(legal.shape) * legal, axis=1)
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+
+# Bound flags for stored values
+EXACT = 0
+LOWER = 1  # True value is at least the stored value (beta cutoff)
+UPPER = 2  # True value is at most the stored value (no move raised alpha)
+
+
+class TTEntry(NamedTuple):
+    value: float
+    flag: int
+    best_move: Optional[Tuple[int, int]]
+    depth: int  # Plies searched below the position, the value is only valid for searches this deep or shallower
+
+
+class TranspositionTable:
+    """ Size capped search cache with least recently used eviction. """
+
+    def __init__(self, max_size: int = 100_000) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+
+        self.max_size = max_size
+        self._entries: 'OrderedDict[Hashable, TTEntry]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[TTEntry]:
+        """ Return the entry for key, or None, and mark it as recently used. """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key: Hashable, value: float, flag: int, best_move: Optional[Tuple[int, int]], depth: int) -> None:
+        """ Store an entry, evicting the least recently used one when full. """
+        self._entries[key] = TTEntry(value, flag, best_move, depth)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def items(self) -> List[Tuple[Hashable, TTEntry]]:
+        """ All entries, least recently used first. """
+        return list(self._entries.items())
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
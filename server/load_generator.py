@@ -0,0 +1,133 @@
+""" Load generator for server/server.py, plays many games at once with random moves.
+
+Every client keeps one connection open and plays games back to back, the
+agents and sides are taken in turn. Reports finished sessions per second and
+the round trip latency of move requests (which includes the agent's reply),
+overall and per agent.
+
+Run from the repository root, against a running server or one it starts itself:
+    python server/load_generator.py --port 8765 --clients 50 --games 2000
+    python server/load_generator.py --spawn --workers 4
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so imports work when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from collections import defaultdict
+from typing import Dict, List
+import numpy as np
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+
+AGENTS = ('minimax', 'qlearn', 'perfect', 'random')
+SHUTDOWN_TIMEOUT = 10  # Seconds a spawned server gets to stop its pool before it is killed
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, message: dict) -> dict:
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    if not reply['ok']:
+        raise RuntimeError(reply['error'])
+    return reply
+
+
+async def client(host: str, port: int, games: List[dict], latencies: Dict[str, List[float]]):
+    """ Play the given games on one connection, move latencies are added per agent """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for settings in games:
+            reply = await request(reader, writer, dict(settings, cmd='new'))
+            while not reply['game_over']:
+                empty = [(r, c) for r, row in enumerate(reply['board']) for c, cell in enumerate(row) if cell == 0]
+                row, col = random.choice(empty)
+
+                start = time.perf_counter()
+                reply = await request(reader, writer, {'cmd': 'move', 'row': row, 'col': col})
+                latencies[settings['agent']].append(time.perf_counter() - start)
+
+        await request_quit(writer)
+    finally:
+        writer.close()
+
+
+async def request_quit(writer: asyncio.StreamWriter):
+    writer.write(b'{"cmd": "quit"}\n')
+    await writer.drain()
+
+
+async def run(host: str, port: int, n_clients: int, n_games: int, agents: List[str]) -> dict:
+    """ Play n_games spread over n_clients connections, returns the measurements """
+    schedule = [{'agent': agents[i % len(agents)], 'player': 'XO'[(i // len(agents)) % 2]} for i in range(n_games)]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, schedule[c::n_clients], latencies) for c in range(n_clients)))
+    elapsed = time.perf_counter() - start
+
+    return {'elapsed': elapsed, 'sessions': n_games, 'latencies': latencies}
+
+
+def report(result: dict):
+    elapsed, sessions = result['elapsed'], result['sessions']
+    print(f"{sessions} sessions in {elapsed:.2f} s: {sessions / elapsed:.1f} sessions/s")
+    print(f"{'agent':10s} {'moves':>7s} {'p50 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}")
+
+    rows = dict(result['latencies'])
+    rows['all'] = [latency for values in result['latencies'].values() for latency in values]
+    for agent, values in rows.items():
+        values = np.array(values) * 1000
+        print(f"{agent:10s} {len(values):7d} {np.percentile(values, 50):8.2f} {np.percentile(values, 99):8.2f} {values.max():8.2f}")
+
+
+async def wait_for_server(host: str, port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            await request_quit(writer)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play many concurrent games against server/server.py')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Server address.')
+    parser.add_argument('--port', type=int, default=8765, help='Server port.')
+    parser.add_argument('--clients', type=int, default=50, help='Concurrent connections.')
+    parser.add_argument('--games', type=int, default=2000, help='Games to play in total.')
+    parser.add_argument('--agents', type=str, default=','.join(AGENTS), help='Comma separated agents to play against.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random moves.')
+    parser.add_argument('--spawn', action='store_true', help='Start a server for the run and stop it afterwards.')
+    parser.add_argument('--workers', type=int, default=None, help='Minimax processes of a spawned server.')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    server = None
+    if args.spawn:
+        command = [sys.executable, str(Path(__file__).parent / 'server.py'), '--host', args.host, '--port', str(args.port)]
+        if args.workers is not None:
+            command += ['--workers', str(args.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, cwd=Path(__file__).parent.parent)
+
+    try:
+        asyncio.run(wait_for_server(args.host, args.port))
+        report(asyncio.run(run(args.host, args.port, args.clients, args.games, args.agents.split(','))))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(SHUTDOWN_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
@@ -0,0 +1,259 @@
+""" Asyncio game server, many concurrent games against shared agents over a JSON line protocol.
+
+Every request and reply is one JSON object on one line. A connection plays one
+game at a time and can start as many games after each other as it likes:
+    {"cmd": "new", "agent": "minimax", "player": "X"}     start a game, optional "rows", "cols", "win_length"
+    {"cmd": "move", "row": 1, "col": 1}                  play a move, the reply includes the agent's answer
+    {"cmd": "stats"}                                     sessions served and move latency percentiles
+    {"cmd": "quit"}                                      close the connection
+Replies carry "ok", and the game as "board" (rows of 0 empty, 1 X, 2 O),
+"turn", "game_over" and "winner" ("X", "O", "draw" or null), or an "error".
+
+The Q-learning and perfect strategy agents are loaded once and shared by all
+games, their moves are table lookups and are answered on the event loop.
+Minimax searches run in a process pool with one MinimaxPlayer per side in
+every worker, so their caches stay warm across games.
+
+Run from the repository root and try it with any line based client:
+    python server/server.py --port 8765
+    nc localhost 8765
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path so imports work when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Dict, Optional, Tuple
+from game.logic import TicTacToe
+from game.symbol import Symbol
+from players.minimax_player import MinimaxPlayer
+from players.model_file import MODEL_EXTENSION
+from players.perfect_strategy_player import PerfectStrategyPlayer
+from players.player import Player
+from players.qlearn_player import QLearnPlayer
+from players.random_player import RandomPlayer
+import numpy as np
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+
+DEFAULT_MODEL = 'models/model.ttm'
+AGENTS = ('minimax', 'qlearn', 'perfect', 'random')
+LATENCY_SAMPLES = 100_000  # Most recent move latencies kept for the percentiles
+
+SYMBOLS = {'X': Symbol.X, 'O': Symbol.O}
+NAMES = {Symbol.X: 'X', Symbol.O: 'O', 0: 'draw', None: None}  # Symbols and winners as sent to clients
+
+
+# Search state of a process pool worker, one player per side so each keeps its own cache
+_worker_players: Dict[int, MinimaxPlayer] = {}
+
+
+def _init_worker(time_budget: Optional[float]):
+    for symbol in (Symbol.X, Symbol.O):
+        _worker_players[symbol] = MinimaxPlayer(symbol, time_budget=time_budget)
+
+
+def _search_move(state: Tuple[int, ...], dims: Tuple[int, int, int], symbol: Symbol) -> Optional[Tuple[int, int]]:
+    """ Minimax move for a board, runs in a worker process """
+    return _worker_players[symbol].get_move(TicTacToe.from_state(state, *dims))
+
+
+class Session:
+    """ One game between a client and an agent """
+
+    def __init__(self, game: TicTacToe, human_symbol: Symbol, agent_name: str, agent: Optional[Player]):
+        self.game = game
+        self.human_symbol = human_symbol
+        self.agent_symbol = Symbol.O if human_symbol == Symbol.X else Symbol.X
+        self.agent_name = agent_name
+        self.agent = agent  # None for minimax, its moves come from the process pool
+
+    def to_dict(self) -> dict:
+        game = self.game
+        return {
+            'ok': True,
+            'board': game.board,
+            'turn': NAMES[game.current_player] if not game.game_over else None,
+            'game_over': game.game_over,
+            'winner': NAMES[game.winner],
+        }
+
+
+class GameServer:
+    """ Serves games to many clients at once from one event loop """
+
+    # model: str - Q-learning model for the qlearn agent, a .ttm file is memory mapped
+    # workers: int - Processes for minimax searches, defaults to the number of CPUs
+    # time_budget: float - Optional limit in seconds per minimax move, boards other than 3x3 default to 1 second
+    def __init__(self, model: str = DEFAULT_MODEL, workers: Optional[int] = None, time_budget: Optional[float] = None):
+        # One copy of every model, games against the other side use with_symbol() which shares it
+        qlearn = QLearnPlayer(Symbol.X, epsilon=0, backend='mmap' if model.endswith(MODEL_EXTENSION) else 'dict')
+        qlearn.load(model)
+        self._agents: Dict[str, Player] = {
+            'qlearn': qlearn,
+            'perfect': PerfectStrategyPlayer(Symbol.X),
+            'random': RandomPlayer(Symbol.X),
+        }
+
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(time_budget,))
+
+        # Counters for the stats command
+        self.sessions_started = 0
+        self.sessions_finished = 0
+        self.latencies: deque = deque(maxlen=LATENCY_SAMPLES)  # Seconds per move request, agent reply included
+        self._start = time.monotonic()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        """ Start listening, the returned server is already accepting connections """
+        # Start the workers now so the first games do not wait for them
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, time.sleep, 0) for _ in range(self.workers)))
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ Answer the requests of one connection until it quits or disconnects """
+        session: Optional[Session] = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("A request is a JSON object")
+                    command = request.get('cmd')
+                    if command == 'new':
+                        session = await self.new_session(request)
+                        reply = session.to_dict()
+                    elif command == 'move':
+                        if session is None:
+                            raise ValueError("Start a game with the new command first")
+                        await self.play_move(session, request)
+                        reply = session.to_dict()
+                        self.latencies.append(time.perf_counter() - start)
+                    elif command == 'stats':
+                        reply = self.stats()
+                    elif command == 'quit':
+                        break
+                    else:
+                        raise ValueError(f"Unknown command: {command}")
+                except KeyError as e:
+                    reply = {'ok': False, 'error': f"Missing field: {e}"}
+                except (ValueError, TypeError) as e:
+                    reply = {'ok': False, 'error': str(e)}
+
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def new_session(self, request: dict) -> Session:
+        agent_name = request['agent']
+        if agent_name not in AGENTS:
+            raise ValueError(f"Unknown agent: {agent_name}, choose from {', '.join(AGENTS)}")
+        if request.get('player', 'X') not in SYMBOLS:
+            raise ValueError("player must be X or O")
+
+        rows, cols, win_length = request.get('rows', 3), request.get('cols', 3), request.get('win_length', 3)
+        if (rows, cols, win_length) != (3, 3, 3) and agent_name in ('qlearn', 'perfect'):
+            raise ValueError("Boards other than 3x3 only work with the minimax and random agents")
+        if rows < 1 or cols < 1 or rows * cols > 400 or not 1 <= win_length <= max(rows, cols):
+            raise ValueError("Unsupported board size")
+
+        human_symbol = SYMBOLS[request.get('player', 'X')]
+        agent_symbol = Symbol.O if human_symbol == Symbol.X else Symbol.X
+        agent = self._agents[agent_name].with_symbol(agent_symbol) if agent_name != 'minimax' else None
+        session = Session(TicTacToe(rows, cols, win_length), human_symbol, agent_name, agent)
+        self.sessions_started += 1
+
+        # The agent opens the game when the client plays O
+        await self.agent_move(session)
+        return session
+
+    async def play_move(self, session: Session, request: dict):
+        game = session.game
+        row, col = int(request['row']), int(request['col'])
+        if game.game_over or game.current_player != session.human_symbol or not game.is_valid_move(row, col):
+            raise ValueError(f"Invalid move: {row}, {col}")
+
+        game.make_move(row, col)
+        await self.agent_move(session)
+        if game.game_over:
+            self.sessions_finished += 1
+
+    async def agent_move(self, session: Session):
+        """ Let the agent answer if it is its turn """
+        game = session.game
+        if game.game_over or game.current_player == session.human_symbol:
+            return
+
+        if session.agent is None:
+            dims = (game.rows, game.cols, game.win_length)
+            move = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _search_move, game.get_board_state(), dims, session.agent_symbol)
+        else:
+            move = session.agent.get_move(game)
+        game.make_move(*move)
+
+    def stats(self) -> dict:
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'ok': True,
+            'sessions_started': self.sessions_started,
+            'sessions_finished': self.sessions_finished,
+            'sessions_per_second': self.sessions_finished / max(time.monotonic() - self._start, 1e-9),
+            'moves': len(latencies),
+            'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+
+async def main(args):
+    # SIGTERM (e.g. terminate() from the load generator) stops serving, so the finally
+    # below still shuts the pool down instead of leaving its workers behind. Installed
+    # before the pool starts, a SIGTERM while the workers warm up is handled too
+    stopped = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    except NotImplementedError:
+        pass  # No signal handlers on Windows, terminate() kills the process there anyway
+
+    server = GameServer(args.model, args.workers, args.time_budget)
+    try:
+        listener = await server.serve(args.host, args.port)
+        print(f"Serving on {', '.join(str(sock.getsockname()) for sock in listener.sockets)}", flush=True)
+        async with listener:
+            await stopped.wait()
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve Tic Tac Toe games over a JSON line protocol')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+    parser.add_argument('--model', type=str, default=DEFAULT_MODEL, help='Q-learning model for the qlearn agent.')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for minimax searches, defaults to the number of CPUs.')
+    parser.add_argument('--time-budget', type=float, default=None, help='Seconds per minimax move, boards other than 3x3 default to 1.')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
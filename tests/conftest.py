@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Tests import the game, players and server modules from the repository root
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,79 @@
+from pathlib import Path
+from game.encoding import decode_state
+from game.logic import TicTacToe
+from game.solver import reachable_codes
+from game.symbol import Symbol
+from players.minimax_player import MinimaxPlayer
+from players.perfect_strategy_player import PerfectStrategyPlayer
+from players.player import Player
+from players.qlearn_player import QLearnPlayer
+from players.random_player import RandomPlayer
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).parent.parent / 'models'
+
+
+class FirstCellPlayer(Player):
+    """ Leaves get_moves to the Player default """
+
+    def get_move(self, game: TicTacToe):
+        return game.get_legal_moves()[0]
+
+
+def qlearn(backend: str, model: str = None, symmetric: bool = False) -> QLearnPlayer:
+    player = QLearnPlayer(Symbol.X, epsilon=0, backend=backend, symmetric=symmetric)
+    if model is not None:
+        player.load(str(MODELS / model))
+    return player
+
+
+PLAYERS = {
+    'default': lambda: FirstCellPlayer(Symbol.X),
+    'random': lambda: RandomPlayer(Symbol.X),
+    'qlearn-dict': lambda: qlearn('dict', 'model.pkl'),
+    'qlearn-array': lambda: qlearn('array', 'model.pkl'),
+    'qlearn-mmap': lambda: qlearn('mmap', 'model.ttm'),
+    'qlearn-dict-symmetric': lambda: qlearn('dict', symmetric=True),
+    'qlearn-array-symmetric': lambda: qlearn('array', symmetric=True),
+    'perfect-solution': lambda: PerfectStrategyPlayer(Symbol.X, solution_table=str(MODELS / 'solution_table.npz')),
+    'perfect-model': lambda: PerfectStrategyPlayer(Symbol.X, policy=str(MODELS / 'perfect_policy.ttm')),
+    'perfect-pickle': lambda: PerfectStrategyPlayer(Symbol.X, policy=str(MODELS / 'perfect_policy.pkl')),
+    'minimax-solution': lambda: MinimaxPlayer(Symbol.X, solution_table=str(MODELS / 'solution_table.npz')),
+    'minimax-search': lambda: MinimaxPlayer(Symbol.X),
+}
+
+
+def narrowed_boards():
+    """ Unfinished boards with at least two empty cells, and their masks without the lowest empty cell """
+    boards = []
+    for code in reachable_codes()[::25]:
+        game = TicTacToe.from_state(decode_state(int(code)))
+        if not game.game_over and len(game.get_legal_cells()) > 1:
+            boards.append(game.get_board_state())
+    boards = np.array(boards, dtype=np.int64)
+    legal = boards == 0
+    legal[np.arange(len(boards)), np.argmax(legal, axis=1)] = False
+    return boards, legal
+
+
+@pytest.mark.parametrize('name', PLAYERS)
+def test_get_moves_stays_in_narrowed_mask(name):
+    """ Every player picks one of the cells it is given, not just an empty one """
+    boards, legal = narrowed_boards()
+    full = PLAYERS[name]().get_moves(boards, boards == 0)
+    assert (boards[np.arange(len(boards)), full] == 0).all()
+
+    # Take each board's own pick away as well, so a player ignoring the mask fails on every board
+    legal[np.arange(len(boards)), full] = False
+    keep = legal.any(axis=1)
+    boards, legal = boards[keep], legal[keep]
+    cells = PLAYERS[name]().get_moves(boards, legal)
+    assert legal[np.arange(len(boards)), cells].all()
+
+
+def test_qlearn_backends_agree_on_narrowed_mask():
+    boards, legal = narrowed_boards()
+    cells = [qlearn(backend, model).get_moves(boards, legal)
+             for backend, model in (('dict', 'model.pkl'), ('array', 'model.pkl'), ('mmap', 'model.ttm'))]
+    assert (cells[0] == cells[1]).all() and (cells[1] == cells[2]).all()
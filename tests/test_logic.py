@@ -0,0 +1,50 @@
+from game.encoding import decode_state
+from game.logic import TicTacToe
+from game.solver import reachable_codes
+import pytest
+
+
+def played_games() -> dict:
+    """ State code -> game reached by playing moves, for every reachable board """
+    games = {}
+
+    def visit(game: TicTacToe) -> None:
+        if game.state_code in games:
+            return
+        games[game.state_code] = (game.current_player, game.game_over, game.winner,
+                                  [list(game.line_counts(player)) for player in (1, 2)])
+        if game.game_over:
+            return
+        for move in game.get_legal_moves():
+            game.push(move)
+            visit(game)
+            game.pop()
+
+    visit(TicTacToe())
+    return games
+
+
+def test_from_state_round_trip():
+    """ Every reachable board comes back as the game that reached it """
+    games = played_games()
+    codes = reachable_codes()
+    assert len(codes) == len(games)
+    for code in codes:
+        state = decode_state(int(code))
+        game = TicTacToe.from_state(state)
+        assert game.get_board_state() == state
+        assert game.state_code == code
+        assert (game.current_player, game.game_over, game.winner,
+                [list(game.line_counts(player)) for player in (1, 2)]) == games[int(code)]
+        assert len(game.get_move_history()) == sum(cell != 0 for cell in state)
+
+
+@pytest.mark.parametrize('state', [
+    (1, 1, 0, 0, 0, 0, 0, 0, 0),  # Player 1 two stones ahead
+    (2, 0, 0, 0, 0, 0, 0, 0, 0),  # Player 2 moved first
+    (1, 1, 1, 2, 2, 2, 0, 0, 0),  # Both players won
+    (0,) * 8,                     # Too short
+])
+def test_from_state_rejects_impossible_boards(state):
+    with pytest.raises(ValueError):
+        TicTacToe.from_state(state)
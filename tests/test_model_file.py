@@ -0,0 +1,16 @@
+from pathlib import Path
+from players.model_file import convert, verify
+import pytest
+
+MODELS = Path(__file__).parent.parent / 'models'
+
+
+@pytest.mark.parametrize('name', ['model', 'model_against_only_minimax', 'perfect_policy'])
+def test_convert_round_trip(name, tmp_path):
+    """ A converted model plays the same move as its pickle on every reachable board """
+    source = str(MODELS / f'{name}.pkl')
+    target = convert(source, str(tmp_path / f'{name}.ttm'))
+
+    mismatches, checked = verify(source, target)
+    assert checked > 0
+    assert mismatches == 0
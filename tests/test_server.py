@@ -0,0 +1,68 @@
+from pathlib import Path
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import pytest
+
+SERVER = Path(__file__).parent.parent / 'server' / 'server.py'
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads child processes from /proc')
+
+
+def children(pid: int) -> list:
+    """ Live processes whose parent is pid """
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name in parentheses may hold spaces, state and ppid follow it
+                state, ppid = f.read().rsplit(')', 1)[1].split()[:2]
+        except OSError:
+            continue
+        if int(ppid) == pid and state != 'Z':
+            found.append(int(entry))
+    return found
+
+
+def alive(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_terminate_stops_pool_workers():
+    command = [sys.executable, str(SERVER), '--port', str(free_port()), '--workers', '2']
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=SERVER.parent.parent)
+    workers = []
+    try:
+        assert server.stdout.readline().startswith('Serving on')
+        workers = children(server.pid)
+        assert len(workers) >= 2
+
+        server.terminate()
+        assert server.wait(10) == 0
+
+        deadline = time.monotonic() + 10
+        while any(alive(pid) for pid in workers) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not [pid for pid in workers if alive(pid)]
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+        for pid in workers:
+            if alive(pid):
+                os.kill(pid, signal.SIGKILL)
@@ -0,0 +1,120 @@
+from game.logic import LINES
+from game.encoding import POWERS
+from players.player import Player
+from players.qlearn_player import QLearnPlayer
+from players.q_table import apply_mean_update
+from trainers.qlearn import QLearnTrainer, progress_bar, BASE_REWARD, WIN_REWARD, DRAW_REWARD, LOSS_PENALTY
+import numpy as np
+
+# Cell indices of the 8 winning lines, shape (8, 3)
+LINE_CELLS = np.array([[row * 3 + col for row, col in line] for line in LINES])
+CODE_WEIGHTS = np.array(POWERS, dtype=np.int64)
+
+
+# Batched Q-Learning Trainer Class
+class BatchQLearnTrainer(QLearnTrainer):
+    """ Plays many games in lockstep on a (n_boards, 9) array.
+
+    Every step picks epsilon-greedy moves for all boards where it is the agent's
+    turn and asks the opponent for all other boards through Player.get_moves.
+    Updates within one step are applied together; when several boards update the
+    same (state, action) their deltas are averaged. The agent must use the
+    'array' Q-table backend. Random numbers come from np.random, seed it for
+    reproducible runs.
+    """
+
+    # n_boards: int - Number of games played at the same time
+    # progress: bool - Show a progress bar while training
+    def __init__(self, n_boards=1024, progress=True):
+        super().__init__(progress=progress)
+        self.n_boards = n_boards
+
+    def train(self, agent: QLearnPlayer, opponent: Player, n_games: int, savepath: str):
+        if agent.backend != 'array':
+            raise ValueError("BatchQLearnTrainer needs a QLearnPlayer with backend='array'")
+        if agent.symmetric:
+            raise ValueError("BatchQLearnTrainer does not support symmetric=True, use QLearnTrainer")
+
+        self._n_games_played = n_games
+        self._opponent_name = type(opponent).__name__
+
+        table = agent._q_table
+        q = table.q
+        n_boards = min(self.n_boards, n_games)
+        boards = np.zeros((n_boards, 9), dtype=np.int8)
+        current = np.ones(n_boards, dtype=np.int8)
+        last_row = np.full(n_boards, -1, dtype=np.int64)  # Q-table row of the agent's last state
+        last_cell = np.zeros(n_boards, dtype=np.int64)    # Cell the agent played from that state
+        active = np.ones(n_boards, dtype=bool)
+        games_started = n_boards
+
+        progress = progress_bar(n_games, self.progress)
+        while active.any():
+            # Agent's turn: learn from the previous move with the base reward, then pick a move
+            agent_boards = np.flatnonzero(active & (current == agent.symbol))
+            if len(agent_boards):
+                rows = table.state_index[boards[agent_boards] @ CODE_WEIGHTS]
+                q_rows = q[rows]
+
+                learning = last_row[agent_boards] >= 0
+                if learning.any():
+                    prev_rows = last_row[agent_boards][learning]
+                    prev_cells = last_cell[agent_boards][learning]
+                    max_current_q = q_rows[learning].max(axis=1)
+                    last_q = q[prev_rows, prev_cells]
+                    delta = agent.learning_rate * (BASE_REWARD + agent.discount_rate * max_current_q - last_q)
+                    apply_mean_update(q, prev_rows, prev_cells, delta)
+
+                cells = np.argmax(q_rows, axis=1)
+                explore = np.random.random(len(agent_boards)) < agent.epsilon
+                if explore.any():
+                    legal = boards[agent_boards][explore] == 0
+                    cells[explore] = np.argmax(np.random.random(legal.shape) * legal, axis=1)
+
+                last_row[agent_boards] = rows
+                last_cell[agent_boards] = cells
+                boards[agent_boards, cells] = agent.symbol
+
+            # Opponent's turn, all boards in one call
+            opponent_boards = np.flatnonzero(active & (current == opponent.symbol))
+            if len(opponent_boards):
+                opponent_view = boards[opponent_boards]
+                cells = opponent.get_moves(opponent_view, opponent_view == 0)
+                boards[opponent_boards, cells] = opponent.symbol
+
+            # Vectorized win and draw detection over the 8 line masks
+            lines = boards[:, LINE_CELLS]
+            agent_won = (lines == agent.symbol).all(axis=2).any(axis=1) & active
+            opponent_won = (lines == opponent.symbol).all(axis=2).any(axis=1) & active
+            full = (boards != 0).all(axis=1) & active
+            finished = agent_won | opponent_won | full
+            current = np.where(active, 3 - current, current).astype(np.int8)
+
+            done = np.flatnonzero(finished)
+            if len(done):
+                rewards = np.where(agent_won[done], WIN_REWARD,
+                                   np.where(opponent_won[done], LOSS_PENALTY, DRAW_REWARD))
+                q[last_row[done], last_cell[done]] = rewards
+
+                outcomes = np.where(agent_won[done], 1, np.where(opponent_won[done], -1, 0))
+                self._n_wins += int((outcomes == 1).sum())
+                self._n_draws += int((outcomes == 0).sum())
+                self._n_losses += int((outcomes == -1).sum())
+                self._history.extend(outcomes)
+                agent.epsilon *= 0.99995 ** len(done)
+                progress.update(len(done))
+
+                # Finished boards start a new game, or retire once n_games have been started
+                restart = done[:max(0, n_games - games_started)]
+                games_started += len(restart)
+                active[done[len(restart):]] = False
+                boards[restart] = 0
+                current[restart] = 1
+                last_row[restart] = -1
+        progress.close()
+
+        # After training is done, save the trained model
+        if not savepath.endswith(agent.model_extension):
+            savepath += agent.model_extension
+
+        agent.save(savepath)
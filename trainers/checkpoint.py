@@ -0,0 +1,161 @@
+from players.qlearn_player import QLearnPlayer
+from typing import Optional
+import numpy as np
+import threading
+import pickle
+import random
+import queue
+import os
+
+CHECKPOINT_VERSION = 1
+
+STATE_FILE = 'state.pkl'      # Everything but the Q-table and history, replaced atomically
+HISTORY_FILE = 'history.bin'  # One int8 outcome per game (1 win, 0 draw, -1 loss), only ever appended
+
+
+# Training Checkpointer Class
+class Checkpointer:
+    """ Periodic, crash safe checkpoints of a QLearnTrainer run.
+
+    A checkpoint directory holds the Q-table of the latest checkpoint in a
+    file named after its game count, the outcome history and state.pkl with
+    epsilon, the counters, the replay buffer and the random and np.random
+    states. state.pkl is written last and replaced atomically, so a crash
+    while saving leaves the previous checkpoint intact. The history file is
+    appended to instead of rewritten and cut back to the length recorded in
+    state.pkl on restore.
+
+    Snapshots are taken on the training thread and written by a background
+    thread, so the training loop only waits for the disk when the previous
+    save has not finished yet.
+    """
+
+    # directory: str - Directory to write checkpoints to, created if missing
+    # every: int - Save after every this many games, counted over the whole run
+    def __init__(self, directory: str, every: int = 10_000):
+        if every <= 0:
+            raise ValueError("every must be positive")
+
+        self.directory = directory
+        self.every = every
+        os.makedirs(directory, exist_ok=True)
+
+        self._n_saved = 0  # History length already queued for writing
+        self._queue = queue.Queue(maxsize=1)
+        self._error: Optional[BaseException] = None
+        self._thread = None
+
+    def exists(self) -> bool:
+        """ Whether the directory holds a checkpoint to restore """
+        return os.path.exists(self._path(STATE_FILE))
+
+    def save(self, trainer, agent: QLearnPlayer) -> None:
+        """ Snapshot the trainer and agent now and write them in the background """
+        self._raise_error()
+
+        history = trainer._history
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'n_games': len(history),
+            'table': f'q_table-{len(history)}{agent.model_extension}',
+            'epsilon': agent.epsilon,
+            'n_wins': trainer._n_wins,
+            'n_draws': trainer._n_draws,
+            'n_losses': trainer._n_losses,
+            'opponent_name': trainer._opponent_name,
+            'replay': trainer.replay,
+            'random_state': random.getstate(),
+            'numpy_state': np.random.get_state(),
+        }
+        # Pickling and copying here keeps later training from changing what gets written
+        new_outcomes = np.asarray(history[self._n_saved:], dtype=np.int8).tobytes()
+        snapshot = (pickle.dumps(state), agent.snapshot(), state['table'], self._n_saved, new_outcomes)
+        self._n_saved = len(history)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name='checkpoint-writer', daemon=True)
+            self._thread.start()
+        self._queue.put(snapshot)
+
+    def flush(self) -> None:
+        """ Wait until every queued checkpoint is on disk, re-raises a failed write """
+        self._queue.join()
+        self._raise_error()
+
+    def restore(self, trainer, agent: QLearnPlayer) -> int:
+        """ Load the latest checkpoint into the trainer and agent, returns the number of games it holds """
+        with open(self._path(STATE_FILE), 'rb') as f:
+            state = pickle.load(f)
+        if state['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"{self.directory} has checkpoint version {state['version']}, "
+                             f"only version {CHECKPOINT_VERSION} is supported")
+        if not state['table'].endswith(agent.model_extension):
+            raise ValueError(f"{self.directory} was saved by an agent with another Q-table backend")
+        if (state['replay'] is None) != (trainer.replay is None):
+            raise ValueError(f"{self.directory} was saved {'without' if state['replay'] is None else 'with'} experience replay")
+
+        # Drop outcomes appended after the last complete checkpoint
+        n_games = state['n_games']
+        with open(self._path(HISTORY_FILE), 'r+b') as f:
+            f.truncate(n_games)
+            outcomes = np.frombuffer(f.read(), dtype=np.int8)
+        if len(outcomes) != n_games:
+            raise ValueError(f"{self.directory} has a history of {len(outcomes)} games, its checkpoint needs {n_games}")
+
+        agent.load(self._path(state['table']))
+        agent.epsilon = state['epsilon']
+        trainer._history.clear()
+        trainer._history.extend(outcomes)
+        trainer._n_wins = state['n_wins']
+        trainer._n_draws = state['n_draws']
+        trainer._n_losses = state['n_losses']
+        trainer._opponent_name = state['opponent_name']
+        trainer.replay = state['replay']
+        random.setstate(state['random_state'])
+        np.random.set_state(state['numpy_state'])
+
+        self._n_saved = n_games
+        return n_games
+
+    def _write_loop(self) -> None:
+        while True:
+            snapshot = self._queue.get()
+            try:
+                if self._error is None:
+                    self._write(*snapshot)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, state: bytes, agent: QLearnPlayer, table: str, offset: int, new_outcomes: bytes) -> None:
+        """ Write one checkpoint, state.pkl last so it only ever points at complete files """
+        with open(self._path(HISTORY_FILE), 'ab') as f:
+            # Cutting at the offset drops leftovers of an earlier run in the same directory
+            f.truncate(offset)
+            f.write(new_outcomes)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The temporary name keeps the extension, agent.save picks the format from it
+        agent.save(self._path('tmp-' + table))
+        os.replace(self._path('tmp-' + table), self._path(table))
+
+        with open(self._path(STATE_FILE + '.tmp'), 'wb') as f:
+            f.write(state)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self._path(STATE_FILE + '.tmp'), self._path(STATE_FILE))
+
+        # Q-tables of older checkpoints are no longer referenced
+        for name in os.listdir(self.directory):
+            if name.startswith('q_table-') and name != table:
+                os.remove(self._path(name))
+
+    def _raise_error(self) -> None:
+        # Later checkpoints build on the history of the failed one, so the error sticks
+        if self._error is not None:
+            raise RuntimeError(f"Writing a checkpoint to {self.directory} failed") from self._error
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
@@ -0,0 +1,136 @@
+from typing import Optional, Tuple
+import numpy as np
+
+# Outcome codes, from the trained agent's point of view
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+# Training History Class
+class TrainingHistory:
+    """ Outcome of every training game in a growable int8 array.
+
+    One byte per game instead of a Python int in a list, the array doubles
+    when it is full. With a log_path the outcomes are also streamed to a CSV
+    file (game,outcome) every chunk_size games, read it back with from_csv.
+    """
+
+    # log_path: str - Optional CSV file to stream outcomes to, it is started over on creation
+    # chunk_size: int - Games buffered before they are appended to the log file
+    # capacity: int - Initial number of games the array holds before it grows
+    def __init__(self, log_path: Optional[str] = None, chunk_size: int = 10_000, capacity: int = 1024):
+        self.log_path = log_path
+        self.chunk_size = chunk_size
+
+        self._outcomes = np.empty(capacity, dtype=np.int8)
+        self._size = 0
+        self._n_logged = 0  # Games already written to the log file
+
+        if log_path is not None:
+            with open(log_path, 'w') as f:
+                f.write('game,outcome\n')
+
+    @property
+    def outcomes(self) -> np.ndarray:
+        """ Outcomes so far, a view that is only valid until the next append """
+        return self._outcomes[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        return self.outcomes[index]
+
+    def count(self, outcome: int) -> int:
+        """ Number of games with this outcome """
+        return int(np.count_nonzero(self.outcomes == outcome))
+
+    def append(self, outcome: int) -> None:
+        if self._size == len(self._outcomes):
+            self._grow(self._size + 1)
+        self._outcomes[self._size] = outcome
+        self._size += 1
+
+        if self.log_path is not None and self._size - self._n_logged >= self.chunk_size:
+            self.flush()
+
+    def extend(self, outcomes) -> None:
+        """ Append a sequence, an array or another TrainingHistory """
+        if isinstance(outcomes, TrainingHistory):
+            outcomes = outcomes.outcomes
+        outcomes = np.asarray(outcomes, dtype=np.int8)
+
+        if self._size + len(outcomes) > len(self._outcomes):
+            self._grow(self._size + len(outcomes))
+        self._outcomes[self._size:self._size + len(outcomes)] = outcomes
+        self._size += len(outcomes)
+
+        if self.log_path is not None and self._size - self._n_logged >= self.chunk_size:
+            self.flush()
+
+    def clear(self) -> None:
+        """ Forget every outcome and start the log file over """
+        self._size = 0
+        self._n_logged = 0
+        if self.log_path is not None:
+            with open(self.log_path, 'w') as f:
+                f.write('game,outcome\n')
+
+    def flush(self) -> None:
+        """ Append the outcomes that are not in the log file yet """
+        if self.log_path is None or self._n_logged == self._size:
+            return
+
+        games = np.arange(self._n_logged + 1, self._size + 1)
+        with open(self.log_path, 'a') as f:
+            np.savetxt(f, np.column_stack((games, self._outcomes[self._n_logged:self._size])), fmt='%d', delimiter=',')
+        self._n_logged = self._size
+
+    def rolling_rates(self, window: int, max_points: int = 2_000) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Win, draw and loss rates in % over the last window games, at no more than max_points games.
+
+        Returns (games, win_rates, draw_rates, loss_rates). Only the window counts
+        at the returned games are computed, from per outcome counts between the
+        window boundaries, so no rolling series over every game is built.
+        """
+        n = self._size
+        window = min(window, n)
+        if window == 0:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty, empty
+
+        # Exclusive end of every plotted window, evenly spread over the history
+        ends = np.unique(np.linspace(window, n, min(max_points, n - window + 1)).astype(np.int64))
+        bounds = np.unique(np.concatenate(([0], ends - window, ends)))
+        starts_at = np.searchsorted(bounds, ends - window)
+        ends_at = np.searchsorted(bounds, ends)
+
+        rates = []
+        for outcome in (WIN, DRAW, LOSS):
+            # Count per stretch between two boundaries, summed up to a count at every boundary
+            counts = np.add.reduceat(self.outcomes == outcome, bounds[:-1], dtype=np.int64)
+            cumulative = np.concatenate(([0], np.cumsum(counts)))
+            rates.append((cumulative[ends_at] - cumulative[starts_at]) * 100 / window)
+
+        return ends, rates[0], rates[1], rates[2]
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'TrainingHistory':
+        """ Read a log file written with log_path """
+        history = cls()
+        data = np.loadtxt(path, delimiter=',', skiprows=1, dtype=np.int64, ndmin=2)
+        history.extend(data[:, 1] if len(data) else [])
+        return history
+
+    def _grow(self, size: int) -> None:
+        capacity = max(size, 2 * len(self._outcomes))
+        outcomes = np.empty(capacity, dtype=np.int8)
+        outcomes[:self._size] = self._outcomes[:self._size]
+        self._outcomes = outcomes
+
+    def __getstate__(self) -> dict:
+        # Only the filled part of the array is worth pickling, e.g. when sent back from a worker process
+        state = self.__dict__.copy()
+        state['_outcomes'] = self.outcomes.copy()
+        return state
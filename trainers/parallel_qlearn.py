@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from game.logic import TicTacToe
+from players.player import Player
+from players.qlearn_player import QLearnPlayer
+from trainers.qlearn import QLearnTrainer, progress_bar
+import numpy as np
+import os
+import random
+
+# Opponent of the current worker process, set once by the pool initializer
+_worker_opponent = None
+
+
+def _init_worker(opponent: Player):
+    global _worker_opponent
+    _worker_opponent = opponent
+
+
+def _train_worker(q: np.ndarray, agent_settings: dict, engine, n_games: int, seed: int):
+    """ Play n_games QLearnTrainer episodes on a copy of the Q-table. """
+    random.seed(seed)
+    np.random.seed(seed)
+
+    agent = QLearnPlayer(backend='array', **agent_settings)
+    agent._q_table.q[:] = q
+
+    trainer = QLearnTrainer(engine)
+    game = engine()
+    for _ in range(n_games):
+        trainer.play_game(game, agent, _worker_opponent)
+
+    return agent._q_table.q, agent.epsilon, trainer._history
+
+
+# Parallel Q-Learning Trainer Class
+class ParallelQLearnTrainer(QLearnTrainer):
+    """ Spreads training games over a process pool and averages the Q-tables.
+
+    Every round each worker copies the shared Q-table, plays sync_every games
+    against its own copy of the opponent and returns its table. The tables are
+    averaged into the agent before the next round. Worker w in round r is seeded
+    with seed + r * n_workers + w, so a run is reproducible for a fixed seed
+    and n_workers. The agent must use the 'array' Q-table backend.
+    """
+
+    # n_workers: int - Number of worker processes, defaults to the number of CPUs
+    # sync_every: int - Games each worker plays between two merges
+    # seed: int - Base seed for the workers
+    # progress: bool - Show a progress bar while training
+    def __init__(self, n_workers=None, sync_every=5_000, seed=0, engine=TicTacToe, progress=True):
+        super().__init__(engine, progress=progress)
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.sync_every = sync_every
+        self.seed = seed
+
+    def train(self, agent: QLearnPlayer, opponent: Player, n_games: int, savepath: str):
+        if agent.backend != 'array':
+            raise ValueError("ParallelQLearnTrainer needs a QLearnPlayer with backend='array'")
+
+        self._n_games_played = n_games
+        self._opponent_name = type(opponent).__name__
+
+        progress = progress_bar(n_games, self.progress)
+        with ProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=(opponent,)) as pool:
+            games_left = n_games
+            round_index = 0
+            while games_left > 0:
+                # Split this round's games as evenly as possible over the workers
+                round_games = min(games_left, self.sync_every * self.n_workers)
+                shares = [round_games // self.n_workers + (w < round_games % self.n_workers)
+                          for w in range(self.n_workers)]
+                shares = [share for share in shares if share > 0]
+
+                agent_settings = {
+                    'symbol': agent.symbol,
+                    'learning_rate': agent.learning_rate,
+                    'discount_rate': agent.discount_rate,
+                    'epsilon': agent.epsilon,
+                    'symmetric': agent.symmetric,
+                }
+                futures = [
+                    pool.submit(_train_worker, agent._q_table.q, agent_settings, self._engine, share,
+                                self.seed + round_index * self.n_workers + w)
+                    for w, share in enumerate(shares)
+                ]
+                results = [future.result() for future in futures]
+
+                # Merge: average the workers' tables, keep history in worker order
+                agent._q_table.q[:] = np.mean([q for q, _, _ in results], axis=0)
+                agent.epsilon = float(np.mean([epsilon for _, epsilon, _ in results]))
+                for _, _, history in results:
+                    self._history.extend(history)
+                    self._n_wins += history.count(1)
+                    self._n_draws += history.count(0)
+                    self._n_losses += history.count(-1)
+
+                games_left -= round_games
+                round_index += 1
+                progress.update(round_games)
+        progress.close()
+
+        # After training is done, save the trained model
+        if not savepath.endswith(agent.model_extension):
+            savepath += agent.model_extension
+
+        agent.save(savepath)
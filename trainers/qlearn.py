@@ -5,9 +5,11 @@ from players.minimax_player import MinimaxPlayer
 from players.random_player import RandomPlayer
 from game.symbol import Symbol
 from game.logic import TicTacToe
-from tqdm import tqdm
-import matplotlib.pyplot as plt
-import pandas as pd
+from game.instrumentation import Instrumentation
+from trainers.replay import ReplayBuffer
+from trainers.checkpoint import Checkpointer
+from trainers.history import DRAW, LOSS, WIN, TrainingHistory
+from typing import Optional
 
 # Define rewards and penalty
 BASE_REWARD = -5
@@ -15,14 +17,53 @@ WIN_REWARD = 100
 DRAW_REWARD = 50
 LOSS_PENALTY = -100
 
+
+class _NoProgress:
+    """ Stands in for a tqdm bar when progress display is off """
+
+    def update(self, n=1):
+        pass
+
+    def close(self):
+        pass
+
+
+def progress_bar(total: int, enabled: bool = True):
+    """ tqdm bar over total training games, tqdm is only imported when the bar is shown """
+    if not enabled:
+        return _NoProgress()
+
+    from tqdm import tqdm
+    return tqdm(total=total, desc="Training")
+
 # Q-Learning Trainer Class
 class QLearnTrainer():
-    def __init__(self):
+    # engine: type - Game class to train on, TicTacToe or any class with the same API
+    # instrumentation: Instrumentation - Optional per-call timing of sampled games, reported after train()
+    # replay: ReplayBuffer - Optional experience replay, transitions are learned right away and also
+    #         stored, after every game the agent learns again from sampled mini-batches
+    # batch_size: int - Transitions per replay mini-batch
+    # replay_steps: int - Mini-batches learned from after every game
+    # checkpointer: Checkpointer - Optional periodic checkpoints, see trainers/checkpoint.py
+    # history_log: str - Optional CSV file the game outcomes are streamed to, see trainers/history.py
+    # progress: bool - Show a progress bar while training
+    def __init__(self, engine=TicTacToe, instrumentation: Optional[Instrumentation] = None,
+                 replay: Optional[ReplayBuffer] = None, batch_size: int = 64, replay_steps: int = 4,
+                 checkpointer: Optional[Checkpointer] = None, history_log: Optional[str] = None,
+                 progress: bool = True):
+        self._engine = engine
+        self.progress = progress
+        self.checkpointer = checkpointer
+        self.instrumentation = instrumentation
+        self.replay = replay
+        self.batch_size = batch_size
+        self.replay_steps = replay_steps
+
         # Initialize default tracking variables
         self._n_wins = 0
         self._n_draws = 0
         self._n_losses = 0
-        self._history = list()
+        self._history = TrainingHistory(history_log)
         self._n_games_played = 0
         self._opponent_name = ''
     
@@ -32,96 +73,151 @@ class QLearnTrainer():
     # n_games: int - Number of games to be played during training
     # savepath: str - Path to save the trained model 
     def train(self, agent: QLearnPlayer, opponent: Player, n_games: int, savepath: str):
+        if self.replay is not None and agent.backend != 'array':
+            raise ValueError("Experience replay needs a QLearnPlayer with backend='array'")
+
         self._n_games_played = n_games
         self._opponent_name = type(opponent).__name__
         
         # Create a new game instance of TicTacToe
-        game = TicTacToe()
+        game = self._engine()
+        
+        if self.instrumentation is not None:
+            self.instrumentation.attach(game, (agent, opponent))
         
         # Loop through the number of games to be played
-        for i in tqdm(range(n_games), desc="Training"):
-            # Initialize variables to track last state and action
-            last_state = None
-            last_action = None
-            
-            # Game loop, run until the game is over
-            while game.game_over == False:
-                move = None
+        progress = progress_bar(n_games, self.progress)
+        try:
+            for i in range(n_games):
+                if self.instrumentation is not None:
+                    self.instrumentation.next_game()
+                self.play_game(game, agent, opponent)
+                progress.update()
                 
-                # Check whose turn it is
-                if game.current_player == agent.symbol:
-                    # If we are in the agent's turn...
-
-                    # Get the current state of the board                    
-                    current_state = game.get_board_state()
-                    
-                    # If there is a last state, learn from the previous action, give it a base reward
-                    if last_state is not None:
-                        agent.learn(last_state, last_action, BASE_REWARD, current_state)
-                    
-                    # Get the agent's move
-                    move = agent.get_move(game)
-                    
-                    # Update last state and action
-                    last_state = current_state
-                    last_action = move
-                    
-                    # Make the move on the game board
-                    game.make_move(*move)
-                    
-                else:
-                    # If it is the opponent's turn, get their move, based on their strategy
-                    move = opponent.get_move(game)
-                    # Make the move on the game board
-                    game.make_move(*move)
-            
-            # When the game is done playing, get the current state of the board (the outcome)
-            current_state = game.get_board_state()
-            
-            # Check the winner and give the appropriate reward or penalty
-            # and update win/draw/loss counters and history
-            match (game.winner):
-                case agent.symbol:
-                    agent.learn(last_state, last_action, WIN_REWARD, current_state, True)
-                    self._n_wins += 1
-                    self._history.append(1)
-                case WinnerState.DRAW:
-                    agent.learn(last_state, last_action, DRAW_REWARD, current_state, True)
-                    self._n_draws += 1
-                    self._history.append(0)
-                case _ :
-                    agent.learn(last_state, last_action, LOSS_PENALTY, current_state, True)
-                    self._n_losses += 1  
-                    self._history.append(-1)
-            
-            # Reset the game for the next round
-            game.reset()
-            # Decay epsilon to reduce exploration rate over time
-            agent.epsilon *= 0.99995
+                # Checkpoints count games over the whole run, so they land on the same games after a resume
+                if self.checkpointer is not None and len(self._history) % self.checkpointer.every == 0:
+                    self.checkpointer.save(self, agent)
+        finally:
+            progress.close()
+            if self.instrumentation is not None:
+                self.instrumentation.detach()
+            self._history.flush()
+            if self.checkpointer is not None:
+                self.checkpointer.flush()
+        
+        if self.instrumentation is not None:
+            self.instrumentation.report()
 
         # After training is done, save the trained model
-        if not savepath.endswith('.pkl'):
-            savepath += '.pkl'
+        if not savepath.endswith(agent.model_extension):
+            savepath += agent.model_extension
 
         agent.save(savepath)
     
+    # Play one training game and update the agent, counters and history
+    # game: TicTacToe - Game instance to play on, it is reset afterwards
+    def play_game(self, game, agent: QLearnPlayer, opponent: Player):
+        # Initialize variables to track last state and action
+        last_state = None
+        last_action = None
+        
+        # Game loop, run until the game is over
+        while game.game_over == False:
+            move = None
+            
+            # Check whose turn it is
+            if game.current_player == agent.symbol:
+                # If we are in the agent's turn...
+
+                # Get the current state of the board, as the agent's Q-table is keyed
+                current_state = agent.state_key(game)
+                
+                # If there is a last state, learn from the previous action, give it a base reward
+                if last_state is not None:
+                    self._learn(agent, last_state, last_action, BASE_REWARD, current_state)
+                
+                # Get the agent's move
+                move = agent.get_move(game)
+                
+                # Update last state and action
+                last_state = current_state
+                last_action = move
+                
+                # Make the move on the game board
+                game.make_move(*move)
+                
+            else:
+                # If it is the opponent's turn, get their move, based on their strategy
+                move = opponent.get_move(game)
+                # Make the move on the game board
+                game.make_move(*move)
+        
+        # When the game is done playing, get the current state of the board (the outcome)
+        current_state = agent.state_key(game)
+        
+        # Check the winner and give the appropriate reward or penalty
+        # and update win/draw/loss counters and history
+        match (game.winner):
+            case agent.symbol:
+                self._learn(agent, last_state, last_action, WIN_REWARD, current_state, True)
+                self._n_wins += 1
+                self._history.append(WIN)
+            case WinnerState.DRAW:
+                self._learn(agent, last_state, last_action, DRAW_REWARD, current_state, True)
+                self._n_draws += 1
+                self._history.append(DRAW)
+            case _ :
+                self._learn(agent, last_state, last_action, LOSS_PENALTY, current_state, True)
+                self._n_losses += 1  
+                self._history.append(LOSS)
+        
+        # Learn from stored experience
+        if self.replay is not None:
+            self._replay(agent)
+
+        # Reset the game for the next round
+        game.reset()
+        # Decay epsilon to reduce exploration rate over time
+        agent.epsilon *= 0.99995
+
+    @property
+    def n_games_trained(self) -> int:
+        """ Games played over every train() call, including ones restored from a checkpoint """
+        return len(self._history)
+
+    def _learn(self, agent: QLearnPlayer, last_state, last_action, reward, current_state, done=False):
+        """ Learn from a transition now and store it for replay """
+        agent.learn(last_state, last_action, reward, current_state, done)
+        if self.replay is not None:
+            self.replay.add(last_state, last_action, reward, current_state, done)
+
+    def _replay(self, agent: QLearnPlayer):
+        """ Learn from replay_steps sampled mini-batches """
+        if len(self.replay) < self.batch_size:
+            return
+
+        for _ in range(self.replay_steps):
+            indices, states, actions, rewards, next_states, dones, weights = self.replay.sample(self.batch_size)
+            td_errors = agent.learn_batch(states, actions, rewards, next_states, dones, weights)
+            self.replay.update_priorities(indices, td_errors)
+
     def plot(self, window_size=500):
         """ Method to plot wins, draws and losses for the tracked agent. """
-        if not self._history:
+        if len(self._history) == 0:
             print("No training history to plot. Please run train() first.")
             return
 
-        df = pd.DataFrame({'outcome': self._history})
+        # Imported here so training and headless runs never load matplotlib
+        import matplotlib.pyplot as plt
 
-        df['Win Rate'] = (df['outcome'] == 1).rolling(window=window_size).mean() * 100
-        df['Draw Rate'] = (df['outcome'] == 0).rolling(window=window_size).mean() * 100
-        df['Loss Rate'] = (df['outcome'] == -1).rolling(window=window_size).mean() * 100
+        # Rolling rates at no more than a couple of thousand games, a plot cannot show more
+        games, win_rate, draw_rate, loss_rate = self._history.rolling_rates(window_size)
 
         plt.figure(figsize=(12, 6))
         
-        plt.plot(df.index, df['Win Rate'], label='Win Rate', color='green', linewidth=2)
-        plt.plot(df.index, df['Draw Rate'], label='Draw Rate', color='orange', linewidth=1.5, linestyle='--')
-        plt.plot(df.index, df['Loss Rate'], label='Loss Rate', color='red', linewidth=1.5, linestyle=':')
+        plt.plot(games, win_rate, label='Win Rate', color='green', linewidth=2)
+        plt.plot(games, draw_rate, label='Draw Rate', color='orange', linewidth=1.5, linestyle='--')
+        plt.plot(games, loss_rate, label='Loss Rate', color='red', linewidth=1.5, linestyle=':')
 
         plt.title(f'Learning Curve vs {self._opponent_name}')
         plt.xlabel('Game Number')
@@ -0,0 +1,90 @@
+from game.encoding import State, as_code
+from typing import Optional, Tuple
+import numpy as np
+
+
+# Experience Replay Buffer Class
+class ReplayBuffer:
+    """ Fixed capacity ring buffer of (state, action, reward, next_state, done) transitions.
+
+    Transitions live in preallocated NumPy arrays, states as base-3 board codes
+    and actions as cell indices, so a sampled mini-batch goes straight into
+    QLearnPlayer.learn_batch. When full, the oldest transition is overwritten.
+
+    With prioritized=True transitions are sampled in proportion to
+    (|TD error| + eps) ** alpha and the sample comes with importance weights
+    (n * P(i)) ** -beta, scaled to at most 1. New transitions get the highest
+    priority seen so far, so each one is sampled at least once early on.
+    Random numbers come from np.random, seed it for reproducible runs.
+    """
+
+    # capacity: int - Maximum number of stored transitions
+    # prioritized: bool - Sample by TD error instead of uniformly
+    # alpha: float - How strongly priorities skew sampling, 0 is uniform
+    # beta: float - Strength of the importance weight correction, 1 corrects fully
+    def __init__(self, capacity: int = 50_000, prioritized: bool = False, alpha: float = 0.6, beta: float = 0.4,
+                 eps: float = 1e-3):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+
+        self._next = 0  # Slot the next transition is written to
+        self._size = 0
+        self._max_priority = 1.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, state: State, action: Tuple[int, int], reward: float, next_state: State, done: bool) -> None:
+        """ Store one transition with board state tuples or codes and a (row, col) action. """
+        i = self._next
+        self.states[i] = as_code(state)
+        self.actions[i] = action[0] * 3 + action[1]
+        self.rewards[i] = reward
+        self.next_states[i] = as_code(next_state)
+        self.dones[i] = done
+        self.priorities[i] = self._max_priority
+
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, ...]:
+        """ Draw a mini-batch, returns (indices, states, actions, rewards, next_states, dones, weights).
+
+        weights is None for uniform sampling.
+        """
+        if self._size == 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+
+        weights: Optional[np.ndarray] = None
+        if self.prioritized:
+            scaled = self.priorities[:self._size] ** self.alpha
+            probabilities = scaled / scaled.sum()
+            indices = np.random.choice(self._size, batch_size, p=probabilities)
+            weights = (self._size * probabilities[indices]) ** -self.beta
+            weights /= weights.max()
+        else:
+            indices = np.random.randint(self._size, size=batch_size)
+
+        return (indices, self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices], weights)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        """ Set the priorities of sampled transitions from their TD errors. """
+        if not self.prioritized:
+            return
+        priorities = np.abs(td_errors) + self.eps
+        self.priorities[indices] = priorities
+        self._max_priority = max(self._max_priority, float(priorities.max()))